@@ -2,13 +2,24 @@
 """
 dump_repo.py – Traverse the project tree rooted at this script’s directory and
 write a human–readable dump of every directory, file name and file contents
-into repo_structure.txt (created next to this script).
+into repo.txt (created next to this script).
+
+The dump is streamed straight to the output file through a buffered writer,
+file by file and chunk by chunk, so memory stays flat however big the repo
+(or its lockfiles) gets. Archived dumps can be compressed on the fly.
 
 Usage:
-    python3 dump_repo.py
+    python3 dump_repo.py                      # → repo.txt
+    python3 dump_repo.py --compress gzip      # → repo.txt.gz
+    python3 dump_repo.py --compress zstd      # → repo.txt.zst (needs zstandard)
+    python3 dump_repo.py -o /tmp/dump.txt
 """
 
 from pathlib import Path
+from typing import Optional, Set, TextIO
+import argparse
+import gzip
+import io
 import os
 import sys
 
@@ -26,6 +37,12 @@ EXCLUDE_DIRS = {
 }
 # Name of the output file created next to this script.
 OUTPUT_FILENAME = "repo.txt"
+# Suffix appended to the output name for each compression mode.
+COMPRESS_SUFFIX = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+# Characters read (and written) per step while copying a file's contents.
+CHUNK_CHARS = 1 << 20
+# Size of the output write buffer, in bytes.
+WRITE_BUFFER = 1 << 20
 # --------------------------------------------------------------------------- #
 
 
@@ -34,9 +51,43 @@ def should_skip_dir(dir_name: str) -> bool:
     return dir_name in EXCLUDE_DIRS
 
 
-def dump_repository(root: Path) -> str:
-    """Return a string containing folder/file tree plus file contents."""
-    pieces: list[str] = []
+def is_utf8_text(file_path: Path) -> bool:
+    """Decode the whole file chunk by chunk (nothing kept) to see if it's text."""
+    try:
+        with file_path.open(encoding="utf-8") as f:
+            while f.read(CHUNK_CHARS):
+                pass
+        return True
+    except (UnicodeDecodeError, ValueError):
+        return False
+
+
+def write_contents(file_path: Path, out: TextIO) -> None:
+    """Copy a file's text to `out`, or a binary size notice if it isn't UTF‑8."""
+    # Validate first: a decode error half‑way must not leave half a file behind
+    if not is_utf8_text(file_path):
+        # Binary or non‑UTF‑8 file
+        size = file_path.stat().st_size
+        out.write(f"[binary file – {size} bytes]")
+        return
+    with file_path.open(encoding="utf-8") as f:
+        while chunk := f.read(CHUNK_CHARS):
+            out.write(chunk)
+
+
+def dump_repository(root: Path, out: TextIO, skip: Optional[Set[Path]] = None) -> None:
+    """
+    Stream the folder/file tree plus file contents to `out`, one piece per
+    line (no trailing newline). Files in `skip` – the dump being written –
+    are left out.
+    """
+    skip = skip or set()
+    newline = ""        # pieces are "\n"‑separated, exactly like "\n".join(pieces)
+
+    def put(text: str) -> None:
+        nonlocal newline
+        out.write(newline + text)
+        newline = "\n"
 
     for dirpath, dirnames, filenames in os.walk(root, topdown=True):
         # filter directories in‑place so os.walk doesn't descend into them
@@ -44,40 +95,65 @@ def dump_repository(root: Path) -> str:
 
         rel_dir = Path(dirpath).relative_to(root)
         folder_header = f"/{rel_dir}/" if rel_dir != Path(".") else "/"
-        pieces.append("=" * 30)
-        pieces.append(folder_header)
-        pieces.append("=" * 30)
+        put("=" * 30)
+        put(folder_header)
+        put("=" * 30)
 
         for filename in sorted(filenames):
             file_path = Path(dirpath) / filename
+            if file_path in skip:
+                continue
             rel_file = file_path.relative_to(root)
-            pieces.append("=" * 30)
-            pieces.append(f"/{rel_file}")
-            pieces.append("=" * 30)
-            try:
-                # Attempt text read; fall back to binary size notice
-                content = file_path.read_text(encoding="utf-8")
-            except (UnicodeDecodeError, ValueError):
-                # Binary or non‑UTF‑8 file
-                size = file_path.stat().st_size
-                content = f"[binary file – {size} bytes]"
-            pieces.append(content)
-            pieces.append("=" * 30)
-
-    return "\n".join(pieces)
-
-
-def main() -> None:
+            put("=" * 30)
+            put(f"/{rel_file}")
+            put("=" * 30)
+            out.write("\n")
+            write_contents(file_path, out)
+            put("=" * 30)
+
+
+def open_output(path: Path, compress: str) -> TextIO:
+    """Buffered text writer for `path`, compressed with gzip or zstd if asked."""
+    if compress == "gzip":
+        raw = gzip.open(path, "wb")
+    elif compress == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            sys.exit("❌ zstd output needs the 'zstandard' package (pip install zstandard)")
+        raw = zstandard.ZstdCompressor().stream_writer(path.open("wb"), closefd=True)
+    else:
+        raw = path.open("wb", buffering=0)
+    return io.TextIOWrapper(io.BufferedWriter(raw, WRITE_BUFFER), encoding="utf-8")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Dump the repository tree and file contents")
+    ap.add_argument("--compress", choices=sorted(COMPRESS_SUFFIX), default="none",
+                    help="compress the dump (gzip: stdlib, zstd: needs zstandard)")
+    ap.add_argument("-o", "--output", type=Path, default=None,
+                    help=f"output path (default: {OUTPUT_FILENAME}[.gz|.zst] next to this script)")
+    return ap.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = parse_args(argv)
     repo_root = Path(__file__).resolve().parent
-    save_path = repo_root / OUTPUT_FILENAME
+    save_path = args.output or repo_root / (OUTPUT_FILENAME + COMPRESS_SUFFIX[args.compress])
+    save_path = save_path.resolve()
+    tmp_path = save_path.with_name(f".{save_path.name}.tmp")
 
     # Ensure parent directory exists (defensive – it should already)
     save_path.parent.mkdir(parents=True, exist_ok=True)
 
     print(f"🔍 Scanning repository at {repo_root} ...", file=sys.stderr)
-    dump_text = dump_repository(repo_root)
-
-    save_path.write_text(dump_text, encoding="utf-8")
+    # write next to the target and rename, so a failed run keeps the old dump
+    try:
+        with open_output(tmp_path, args.compress) as out:
+            dump_repository(repo_root, out, skip={save_path, tmp_path})
+        os.replace(tmp_path, save_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
     print(f"✅ Repository structure written to {save_path}", file=sys.stderr)
 
 
@@ -1,3 +1,14 @@
+/** One pre‑rendered thumbnail size of a sticker.   */
+export interface ThumbVariant {
+  /** actual pixel dimensions of the file             */
+  w: number;
+  h: number;
+  /** file size, for bandwidth‑aware clients          */
+  bytes: number;
+  /** file name next to the sticker                   */
+  file: string;
+}
+
 /**
  * Pure data representation of one sticker as it exists in
  *  ▸  packages/stickers/index.json
@@ -15,12 +26,22 @@ export interface StickerEntry {
   /** animated = true → show a <video> / <img src="…gif">   */
   animated: boolean;
 
+  /** animated only: frame count, total duration and source
+   *  size – enough to decide whether to autoplay            */
+  frames?: number;
+  durationMs?: number;
+  bytes?: number;
+
   /** 0 – 1 relative default position on the screen */
   defaultPosition: { x: number; y: number };
 
   /** square 128 px preview used in picker            */
   thumb: string;
 
+  /** ladder of pre‑rendered sizes, smallest first – pick
+   *  the smallest one that covers the slot × devicePixelRatio */
+  thumbs?: ThumbVariant[];
+
   /** how “viral” this sticker is (drives sorting)    */
   viralityTier: 1 | 2 | 3 | 4;
 
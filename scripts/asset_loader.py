@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+asset_loader.py – read each sticker once, probe its header without decoding
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+
+• `load_asset(path)` – one read into a buffer, plus its size and sha256
+  (same hex as catalog_cache.file_digest)
+• `probe_webp(data)` – width, height and animation straight from the
+  RIFF header (VP8X canvas, VP8 key frame or VP8L bitstream header),
+  no pixels decoded
+• the buffer is what hashing, the decode pool, Vision and Gemini all
+  get – the builder loads it as the sticker enters the worker window, so
+  a sticker is read once there, not once per stage
+"""
+
+import hashlib
+from pathlib import Path
+from typing import NamedTuple
+
+class WebpInfo(NamedTuple):
+    width: int
+    height: int
+    animated: bool              # VP8X animation flag – may still be one frame
+
+class Asset(NamedTuple):
+    path: Path
+    data: bytes
+    digest: str
+    size: int
+
+def probe_webp(data: bytes) -> WebpInfo:
+    """Header fields of a WebP buffer; ValueError if it isn't one."""
+    if len(data) < 30 or data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        raise ValueError("not a RIFF/WEBP file")
+    fourcc = data[12:16]                # first chunk; its payload starts at 20
+    if fourcc == b"VP8X":
+        flags = data[20]
+        return WebpInfo(int.from_bytes(data[24:27], "little") + 1,
+                        int.from_bytes(data[27:30], "little") + 1,
+                        bool(flags & 0x02))
+    if fourcc == b"VP8 ":               # 3‑byte frame tag, start code, 14‑bit sizes
+        if data[23:26] != b"\x9d\x01\x2a":
+            raise ValueError("bad VP8 start code")
+        return WebpInfo(int.from_bytes(data[26:28], "little") & 0x3FFF,
+                        int.from_bytes(data[28:30], "little") & 0x3FFF, False)
+    if fourcc == b"VP8L":               # signature, then 14 + 14 + 1 bits
+        if data[20] != 0x2F:
+            raise ValueError("bad VP8L signature")
+        bits = int.from_bytes(data[21:25], "little")
+        return WebpInfo((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, False)
+    raise ValueError(f"unknown WebP chunk {fourcc!r}")
+
+def load_asset(path: Path) -> Asset:
+    data = path.read_bytes()
+    return Asset(path, data, hashlib.sha256(data).hexdigest(), len(data))
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+bench_sticker_catalog.py – offline benchmark for build_sticker_catalog.py
+––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+
+• generates synthetic sticker trees (`--sizes 1000,10000,50000`, a share
+  of them animated) once under `--workdir`, then copies a pristine tree
+  for every run
+• runs the builder stage by stage – scan, thumbs (cold decode), score,
+  manifest, csv, dupes, then a warm no‑op rebuild – each in its own
+  process, against stub Vision/Gemini backends with configurable latency
+• reports wall time, stickers/s, peak RSS (builder + pool workers) and
+  bytes written per stage as JSON; `--baseline` compares against a saved
+  report and exits 1 when a stage got slower than `--tolerance`
+
+    python scripts/bench_sticker_catalog.py --sizes 1000 --out bench.json
+    python scripts/bench_sticker_catalog.py --sizes 1000 --baseline bench.json
+"""
+
+import argparse, hashlib, json, os, platform, random, resource, shutil, subprocess, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from PIL import Image, ImageDraw
+
+from catalog_watch import scan_tree
+
+BENCH_VERSION = 1
+STAGE_RUNS = ("scan", "thumbs", "score", "manifest", "csv", "dupes", "warm")
+SCRIPTS = Path(__file__).resolve().parent
+
+# ── synthetic trees ─────────────────────────────────────────────────────
+def make_sticker(args) -> None:
+    """One random sticker: a few translucent shapes, animated if asked."""
+    path, seed, animated = args
+    rng = random.Random(seed)
+    w, h = rng.randint(256, 768), rng.randint(256, 768)
+
+    def frame(shift: int) -> Image.Image:
+        im = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+        d = ImageDraw.Draw(im)
+        for _ in range(6):
+            x0, y0 = rng.randrange(w), rng.randrange(h)
+            box = (x0 + shift, y0, x0 + shift + rng.randint(20, w // 2), y0 + rng.randint(20, h // 2))
+            fill = tuple(rng.randrange(256) for _ in range(3)) + (rng.randint(128, 255),)
+            (d.ellipse if rng.random() < 0.5 else d.rectangle)(box, fill=fill)
+        return im
+
+    if animated:
+        frames = [frame(i * 4) for i in range(8)]
+        frames[0].save(path, "WEBP", save_all=True, append_images=frames[1:],
+                       duration=100, loop=0, quality=75)
+    else:
+        frame(0).save(path, "WEBP", quality=80)
+
+def make_tree(src: Path, n: int, animated_ratio: float, jobs: int) -> None:
+    """Pristine flat tree of `n` stickers, reused while its config matches."""
+    stamp = src / "tree.json"
+    config = {"count": n, "animated": animated_ratio, "version": BENCH_VERSION}
+    if stamp.exists() and json.loads(stamp.read_text()) == config:
+        return
+    shutil.rmtree(src, ignore_errors=True)
+    src.mkdir(parents=True)
+    rng = random.Random(n)
+    work = [(src / f"bench_{i:05d}.webp", i, rng.random() < animated_ratio) for i in range(n)]
+    with ProcessPoolExecutor(jobs) as pool:
+        list(pool.map(make_sticker, work, chunksize=64))
+    stamp.write_text(json.dumps(config))
+
+def fresh_root(src: Path, root: Path) -> None:
+    """ROOT layout the builder expects, with a copy of the pristine tree."""
+    shutil.rmtree(root, ignore_errors=True)
+    packs = root / "packages" / "stickers"
+    packs.mkdir(parents=True)
+    for p in src.glob("*.webp"):
+        shutil.copy2(p, packs / p.name)
+
+# ── stub backends ───────────────────────────────────────────────────────
+class FakeGeminiModel:
+    """`GenerativeModel.generate_content` stand‑in: a stable tier per image."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def generate_content(self, parts, generation_config=None):
+        time.sleep(self.latency)
+        return SimpleNamespace(text=str(1 + hashlib.sha1(parts[-1]).digest()[0] % 4))
+
+def fake_matches(content: bytes) -> int:
+    return int.from_bytes(hashlib.sha1(content).digest()[:2], "big") % 1500
+
+def run_child(stage: str, args: argparse.Namespace) -> Dict:
+    """One stage inside this (fresh) process; STICKER_ROOT is already set."""
+    import build_sticker_catalog as b
+    from vision_batch import FakeVisionClient
+
+    b.vision_batcher.client = b.LimitedVisionClient(
+        FakeVisionClient(fake_matches, latency=args.vision_latency))
+    b.vision_batcher.features = [{"type_": "WEB_DETECTION", "max_results": 1}]
+    b._clients["gemini"] = FakeGeminiModel(args.gemini_latency)
+    b.RETRY_PAUSE = 0.0
+
+    start = time.perf_counter()
+    if stage == "scan":
+        b.scan_stickers()                  # the builder's own scan + foldering pass
+    else:
+        argv = ["--jobs", str(args.jobs), "--vision-qps", str(args.vision_qps),
+                "--gemini-qps", str(args.gemini_qps)]
+        if stage != "warm":
+            argv += ["--stages", stage]
+        b.main(argv)
+    wall = time.perf_counter() - start
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {"wall_s": wall, "peak_rss_mb": own / 1024, "peak_worker_rss_mb": kids / 1024}
+
+def run_stage(stage: str, root: Path, n: int, args: argparse.Namespace) -> Dict:
+    before = scan_tree(root, lambda name: True)
+    env = dict(os.environ, STICKER_ROOT=str(root))
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--child", stage,
+           "--jobs", str(args.jobs), "--vision-latency", str(args.vision_latency),
+           "--gemini-latency", str(args.gemini_latency),
+           "--vision-qps", str(args.vision_qps), "--gemini-qps", str(args.gemini_qps)]
+    out = subprocess.run(cmd, env=env, cwd=SCRIPTS, check=True,
+                         capture_output=True, text=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    after = scan_tree(root, lambda name: True)
+    # a path that changed but whose (size, mtime) merely moved is not a write
+    moved = {stat for p, stat in before.items() if p not in after}
+    result["bytes_written"] = sum(size for p, (size, mtime) in after.items()
+                                  if before.get(p) != (size, mtime)
+                                  and (size, mtime) not in moved)
+    result["per_s"] = n / result["wall_s"] if result["wall_s"] else None
+    return result
+
+# ── reporting ───────────────────────────────────────────────────────────
+def compare(report: Dict, baseline: Dict, tolerance: float, slack: float) -> List[str]:
+    """Stages slower than baseline · (1 + tolerance) and by more than `slack` s."""
+    slower = []
+    for size, res in report["results"].items():
+        base = baseline.get("results", {}).get(size)
+        if not base:
+            continue
+        for stage, cur in res.items():
+            old = base.get(stage)
+            if not old or not old["wall_s"]:
+                continue
+            ratio = cur["wall_s"] / old["wall_s"]
+            cur["vs_baseline"] = round(ratio, 3)
+            if ratio > 1 + tolerance and cur["wall_s"] - old["wall_s"] > slack:
+                slower.append(f"{size}/{stage}: {old['wall_s']:.2f}s → {cur['wall_s']:.2f}s (×{ratio:.2f})")
+    return slower
+
+def print_table(report: Dict) -> None:
+    print(f"{'size':>6} {'stage':<9} {'wall s':>8} {'/s':>9} {'RSS MB':>8} {'wkr MB':>8} {'written':>12} {'vs base':>8}",
+          file=sys.stderr)
+    for size, res in report["results"].items():
+        for stage, r in res.items():
+            print(f"{size:>6} {stage:<9} {r['wall_s']:>8.2f} {r['per_s'] or 0:>9.1f} "
+                  f"{r['peak_rss_mb']:>8.1f} {r['peak_worker_rss_mb']:>8.1f} "
+                  f"{r['bytes_written']:>12,} {r.get('vs_baseline', ''):>8}", file=sys.stderr)
+
+def int_list(text: str) -> List[int]:
+    return [int(t) for t in text.split(",") if t.strip()]
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Benchmark the sticker catalog builder offline")
+    ap.add_argument("--sizes", type=int_list, default=[1000], metavar="N,…",
+                    help="synthetic tree sizes, e.g. 1000,10000,50000")
+    ap.add_argument("--animated", type=float, default=0.1, metavar="RATIO",
+                    help="share of animated stickers")
+    ap.add_argument("--stages", default=",".join(STAGE_RUNS), metavar="S,…",
+                    help=f"stage runs, in order, from {','.join(STAGE_RUNS)}")
+    ap.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--vision-latency", type=float, default=0.05, metavar="S",
+                    help="stub Vision seconds per batch RPC")
+    ap.add_argument("--gemini-latency", type=float, default=0.2, metavar="S",
+                    help="stub Gemini seconds per call")
+    ap.add_argument("--vision-qps", type=float, default=1e6)
+    ap.add_argument("--gemini-qps", type=float, default=1e6)
+    ap.add_argument("--workdir", type=Path, default=Path("/tmp/sticker-bench"))
+    ap.add_argument("--out", type=Path, help="write the JSON report here (default: stdout)")
+    ap.add_argument("--baseline", type=Path, help="saved report to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.10,
+                    help="allowed slowdown vs baseline before failing")
+    ap.add_argument("--slack", type=float, default=0.05, metavar="S",
+                    help="ignore slowdowns smaller than this many seconds (timer noise)")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    return ap.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.child:
+        print(json.dumps(run_child(args.child, args)))
+        return 0
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGE_RUNS)
+    if unknown:
+        sys.exit(f"❌  unknown stage run(s): {', '.join(sorted(unknown))}")
+    report = {
+        "version": BENCH_VERSION,
+        "host": {"python": platform.python_version(), "machine": platform.machine(),
+                 "cpus": os.cpu_count()},
+        "config": {"jobs": args.jobs, "animated": args.animated,
+                   "vision_latency": args.vision_latency, "gemini_latency": args.gemini_latency},
+        "results": {},
+    }
+    for n in args.sizes:
+        src = args.workdir / f"src-{n}"
+        t = time.perf_counter()
+        make_tree(src, n, args.animated, args.jobs)
+        print(f"🧪  {n} stickers ready ({time.perf_counter() - t:.1f}s)", file=sys.stderr)
+        root = args.workdir / f"run-{n}"
+        fresh_root(src, root)
+        report["results"][str(n)] = {s: run_stage(s, root, n, args) for s in stages}
+
+    slower = compare(report, json.loads(args.baseline.read_text()), args.tolerance, args.slack) \
+        if args.baseline else []
+    print_table(report)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text)
+    else:
+        print(text)
+    for line in slower:
+        print(f"⚠️  slower: {line}", file=sys.stderr)
+    return 1 if slower else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+bg_removal.py – opt‑in background removal for sticker thumbnails (--remove-bg)
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+
+• one rembg/onnxruntime session per run, created on first use and shared
+  by every worker thread (ONNX inference releases the GIL)
+• images go through the pool in batches of `batch`, so memory stays flat
+  however many stickers need a cutout
+• sources that already carry meaningful alpha, and animations, are left
+  alone – they keep rendering from the original file
+• cutouts are cached as lossless WebP under .cache/cutouts/, keyed by
+  model + source content hash; decisions (cutout / skipped) live in a
+  JSON‑lines store next to them, so reruns never touch the model
+"""
+
+import logging, os, threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from catalog_cache import JsonlStore, file_digest
+from catalog_metrics import METRICS
+
+DEFAULT_MODEL = "u2net"
+ALPHA_SHARE = 0.01              # ≥ 1 % non‑opaque pixels → already cut out
+
+def has_meaningful_alpha(im: Image.Image, share: float = ALPHA_SHARE) -> bool:
+    if "A" not in im.getbands() and "transparency" not in im.info:
+        return False
+    alpha = im.convert("RGBA").getchannel("A").histogram()
+    return sum(alpha[:250]) >= share * im.width * im.height
+
+class BackgroundRemover:
+    def __init__(self, cache_dir: Path, model: str = DEFAULT_MODEL, threads: int = 4,
+                 workers: int = 2, batch: int = 16):
+        self.dir = cache_dir / "cutouts"
+        self.model = model
+        self.threads = max(1, threads)
+        self.workers = max(1, workers)
+        self.batch = max(1, batch)
+        self.store: Optional[JsonlStore] = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def session(self):
+        """The rembg session – model loaded once, threads set before it exists."""
+        with self._lock:
+            if self._session is None:
+                # rembg sizes onnxruntime's intra/inter‑op pools from this
+                os.environ["OMP_NUM_THREADS"] = str(self.threads)
+                from rembg import new_session
+                self._session = new_session(self.model)
+            return self._session
+
+    def _one(self, job: Tuple[Path, str]) -> Tuple[str, Dict]:
+        webp, key = job
+        with Image.open(webp) as im:
+            if getattr(im, "is_animated", False):
+                return key, {"skip": "animated"}
+            im.load()
+            if has_meaningful_alpha(im):
+                return key, {"skip": "alpha"}
+            from rembg import remove
+            with METRICS.timer("bg.remove", file=webp.name):
+                out = remove(im.convert("RGBA"), session=self.session())
+        dest = self.dir / f"{key.replace(':', '-')}.webp"
+        out.save(dest, "WEBP", lossless=True)
+        return key, {"file": dest.name}
+
+    def cutouts(self, webps: List[Path],
+                digests: Optional[Dict[Path, str]] = None) -> Dict[Path, Path]:
+        """
+        source → cutout for every sticker that gets one (cached or new);
+        `digests` holds content hashes already known and is completed.
+        """
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if self.store is None:
+            self.store = JsonlStore(self.dir / "cutouts.jsonl")
+        digests = digests if digests is not None else {}
+        for w in webps:
+            if w not in digests:
+                digests[w] = file_digest(w)
+        keys = {w: f"{self.model}:{digests[w]}" for w in webps}
+        todo = []
+        for w in webps:
+            rec = self.store.get(keys[w])
+            if rec is None or ("file" in rec and not (self.dir / rec["file"]).exists()):
+                todo.append((w, keys[w]))
+        METRICS.count("cache.bg.hit", len(webps) - len(todo))
+        METRICS.count("cache.bg.miss", len(todo))
+        if todo:
+            logging.info("Background removal: %d image(s), model %s", len(todo), self.model)
+            with ThreadPoolExecutor(self.workers) as pool:
+                for i in range(0, len(todo), self.batch):
+                    for key, rec in pool.map(self._one, todo[i:i + self.batch]):
+                        self.store.put(key, rec)
+                        if "skip" in rec:
+                            METRICS.count(f"bg.skip.{rec['skip']}")
+        out = {}
+        for w in webps:
+            rec = self.store.get(keys[w])
+            if rec and "file" in rec:
+                out[w] = self.dir / rec["file"]
+        return out
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
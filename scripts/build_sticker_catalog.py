@@ -5,23 +5,110 @@ build_sticker_catalog.py – one‑pass manifest + Shopify CSV generator
 
 • Root path fixed at /mnt/c/icon
 • ONE folder per sticker image (auto‑created if missing)
-• Generates 128×128 PNG thumbnail, manifest.json and Shopify CSV
+• Generates 128×128 thumbnail (PNG, or WebP/AVIF via `--thumb-format`),
+  manifest.json and Shopify CSV; `--regenerate-thumbs` rebuilds oversized
+  or unreadable thumbnails in parallel
+• plus a ladder of thumbnail sizes (`--thumb-ladder`, `--thumb-densities`)
+  rendered from one decode and listed as `thumbs: [{w,h,bytes,file}]`;
+  rungs at or above the source's size, or heavier than the source file,
+  are skipped
+• manifests are collected in memory and only rewritten when their text
+  changes; packages/stickers/index.json is produced in the same pass,
+  plus index.bin – sorted fixed‑width records for mmap lookups
+  (catalog_binindex.py) – and search.json, an inverted index over
+  name/id/tag tokens with prefix + fuzzy queries (catalog_search.py)
+• `--atlas` packs the thumbnails into a few sprite sheets plus an
+  id → sheet/x/y/w/h index (packages/stickers/atlas/), incrementally
+• `--jobs N` pipelines decode/thumbnail (process pool) and scoring
+  (thread pool); results are committed in scan order, so output is
+  byte‑identical to the serial run
+• stickers are read through asset_loader.py: dimensions and animation
+  come from the RIFF/VP8X header, and one read per sticker feeds its
+  content hash, the single decode (dHash + thumbnails) and the
+  Vision/Gemini requests – loaded as the sticker enters the worker
+  window, so memory stays flat; hashes of unchanged files come from the
+  scan snapshot and are shared with `--optimize-sources`/`--remove-bg`
+• content‑hash build cache (.cache/sticker_build.jsonl): unchanged
+  stickers skip decode and thumbnailing entirely
+• virality score store (.cache/virality_scores.jsonl) keyed by image
+  hash; entries older than `--score-ttl` are refreshed, at most
+  `--rescore-budget` (stalest first) per run
+• Vision web detection is batched (`--vision-batch`, `--vision-max-bytes`)
+  into batch_annotate_images calls instead of one RPC per sticker
+• Vision/Gemini calls share a rate limiter with per‑backend concurrency
+  caps and jittered backoff; stickers that still fail transiently are
+  retried at the end of the run instead of being priced as tier 1, and
+  a failed Vision/Gemini answer is never stored as a score – the
+  sticker keeps its previous one (or is skipped)
+• Google clients are imported and built lazily, on the first API call;
+  `--stages` picks what runs (manifest, thumbs, score, csv), so
+  metadata‑only runs never touch credentials
+• a 64‑bit dHash per sticker (taken during decode, cached) feeds the
+  `dupes` stage: a multi‑index hash groups near‑duplicates into
+  logs/duplicate_clusters.json; `--share-cluster-scores` lets a cluster
+  reuse one stored virality score instead of paying for each variant
+• animated WebPs are streamed frame by frame: one pass for durations and
+  alpha bboxes, thumbnails animated at ≤ `--anim-max-frames` frames and
+  ≤ `--anim-max-fps`; manifests gain frames/durationMs/bytes for them
+• `--shards` adds packages/stickers/shards/: index pages named by content
+  hash (`--shard-count`, `--shard-bytes`) listed in shards.json, plus
+  product_catalog-<n>.csv chunks under Shopify's import size limit
+• `--remove-bg` cuts stickers without meaningful alpha out with one
+  shared rembg session (batched, `--bg-threads`/`--bg-workers`) and
+  renders their thumbnails from the cutout; cutouts are cached by hash
+• `--optimize-sources` re‑encodes source WebPs in parallel at the lowest
+  quality that keeps block SSIM ≥ `--source-min-ssim`, without EXIF/XMP,
+  keeping the result only when it is smaller; their stored scores and
+  build records follow them to the new hash, and bytes saved are reported
+• finished stickers are journaled (.cache/build_journal.jsonl) until the
+  CSV and manifests are committed; after a crash `--resume` replays the
+  journal atomically and only processes what is left
+• every run ends with a per‑stage summary (decode, thumbnail, Vision,
+  Gemini, CSV/manifest I/O: count, total, mean, max; cache hits/misses);
+  `--trace FILE` adds Chrome trace events, `--profile cpu|mem` wraps the
+  run in cProfile or tracemalloc
+• the tree is found with one os.scandir pass (size + mtime per source)
+  and compared to .cache/scan_snapshot.jsonl: only new, modified or
+  stale‑scored stickers are queued, the rest are restored from the
+  snapshot (no manifest is opened), deleted ones are dropped; a run that
+  queues and removes nothing leaves the CSV, manifests and indexes
+  untouched – `--full-scan` queues everything (e.g. after deleting
+  thumbnails by hand)
+• `--watch` keeps running after the build: inotify (watchdog, if
+  installed) or `--poll` events are debounced and only the added or
+  changed stickers are rebuilt; deleted ones lose their CSV row,
+  manifest entry and thumbnails
 """
 
 # ── stdlib ──────────────────────────────────────────────────────────────
-import csv, json, logging, os, re, sys, time, shutil          # ❶ shutil added
+import argparse, contextlib, csv, functools, io, itertools, json, logging, os, re, sys, threading, time, shutil  # ❶ shutil added
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
 
 # ── third‑party ─────────────────────────────────────────────────────────
-from PIL import Image                                          # Pillow ≥10.0
-from rembg import remove
+from PIL import Image, ImageSequence                           # Pillow ≥10.0
 
-import google.cloud.vision as vision
-import google.generativeai as genai
+# google.cloud.vision / google.generativeai are imported lazily – see
+# get_vision_client() / get_gem_model(); rembg only by bg_removal, with --remove-bg
+
+from asset_loader import load_asset, probe_webp
+from bg_removal import DEFAULT_MODEL, BackgroundRemover
+from catalog_binindex import encode_index
+from catalog_cache import JsonlStore, atomic_write_bytes, atomic_write_text, file_digest
+from catalog_metrics import METRICS, measured, profiled
+from catalog_search import build_search_index, dump_search_index
+from catalog_shards import SHARD_BYTES, SHARD_COUNT, SHOPIFY_CSV_LIMIT, write_csv_chunks, write_shards
+from catalog_watch import Watcher, scan_tree
+from source_optimize import MIN_SSIM, OPTIMIZE_VERSION, QUALITY_RANGE, optimize_source
+from phash import DEFAULT_RADIUS, clusters, dhash, to_hex
+from sticker_atlas import build_atlas, member_for
+from rate_limit import Backend, Deferred, TokenBucket
+from vision_batch import DEFAULT_MAX_BYTES, MAX_BATCH_SIZE, BatchResult, VisionBatcher
 
 # ── configuration ───────────────────────────────────────────────────────
-ROOT   = Path("/mnt/c/icon")            # ❷ absolute repo root
+ROOT   = Path(os.environ.get("STICKER_ROOT", "/mnt/c/icon"))   # ❷ absolute repo root
 PACKS  = ROOT / "packages" / "stickers"
 LOGDIR = ROOT / "logs"; LOGDIR.mkdir(parents=True, exist_ok=True)
 
@@ -32,10 +119,31 @@ logging.basicConfig(
 )
 
 os.environ.setdefault("GOOGLE_APPLICATION_CREDENTIALS", "svc-key.json")
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 CSV_PATH = ROOT / "product_catalog.csv"
 
+# bump whenever decode/thumbnail output changes → invalidates build cache
+PIPELINE_VERSION = "6"
+CACHE_DIR   = ROOT / ".cache"
+BUILD_CACHE = CACHE_DIR / "sticker_build.jsonl"
+SCORE_STORE = CACHE_DIR / "virality_scores.jsonl"
+JOURNAL     = CACHE_DIR / "build_journal.jsonl"
+OPTIMIZE_STORE = CACHE_DIR / "optimized.jsonl"
+SCAN_SNAPSHOT  = CACHE_DIR / "scan_snapshot.jsonl"
+SNAPSHOT_CONFIG = "#config"             # snapshot key holding the output settings
+SCORE_TTL_DAYS = 30.0
+ATLAS_DIR   = PACKS / "atlas"
+INDEX_PATH  = PACKS / "index.json"
+SHARD_DIR   = PACKS / "shards"
+DUPES_REPORT = LOGDIR / "duplicate_clusters.json"
+
+# API budgets: sustained calls/s (Vision is charged per image), in‑flight cap
+VISION_QPS, VISION_CONCURRENCY = 25.0, 4
+GEMINI_QPS, GEMINI_CONCURRENCY = 1.0, 2
+RETRY_ROUNDS, RETRY_PAUSE = 2, 30.0     # end‑of‑run passes over deferred stickers
+
+STAGES = ("manifest", "thumbs", "score", "csv", "dupes")
+
 # ── helpers (unchanged) ────────────────────────────────────────────────
 def slug(text: str) -> str:
     return re.sub(r"[^0-9A-Za-z._-]+", "-", text.lower()).strip("-")[:60]
@@ -43,38 +151,396 @@ def slug(text: str) -> str:
 def is_animated_webp(img: Image.Image) -> bool:
     return getattr(img, "is_animated", False) and getattr(img, "n_frames", 1) > 1
 
-def smart_thumbnail(src: Path, dest: Path, size: Tuple[int,int]=(128,128)) -> None:
-    with Image.open(src).convert("RGBA") as im:
-        bbox = im.split()[3].getbbox() or (0,0)+im.size
-        im.crop(bbox).thumbnail(size, Image.LANCZOS)
+# ── thumbnail engine ───────────────────────────────────────────────────
+THUMB_FORMATS = {"png": "PNG", "webp": "WEBP", "avif": "AVIF"}
+
+@dataclass(frozen=True)
+class ThumbSpec:
+    size: Tuple[int, int] = (128, 128)
+    fmt: str = "png"                   # key of THUMB_FORMATS
+    quality: int = 80                  # WebP / AVIF
+    png_level: int = 9                 # zlib level for PNG (0‑9)
+    ladder: Tuple[int, ...] = (64, 128, 256)   # CSS px boxes for `thumbs`
+    densities: Tuple[int, ...] = (1, 2)        # device‑pixel ratios per box
+    max_frames: int = 24               # animated thumbnails: frame cap …
+    max_fps: float = 12.0              # … and frame‑rate cap
+
+    def save_args(self, animated: bool = False) -> Dict:
+        if self.fmt == "png":
+            if animated:                   # APNG: full RGBA frames, replace don't blend
+                return {"compress_level": self.png_level, "disposal": 1, "blend": 0}
+            return {"optimize": self.png_level >= 9, "compress_level": self.png_level}
+        if self.fmt == "webp":
+            return {"quality": self.quality, "method": 6}
+        return {"quality": self.quality}
+
+    def ladder_px(self) -> List[int]:
+        """Distinct square pixel boxes of the ladder, smallest first."""
+        return sorted({box * d for box in self.ladder for d in self.densities})
+
+DEFAULT_THUMB = ThumbSpec()
+
+def thumb_path(webp: Path, spec: ThumbSpec = DEFAULT_THUMB) -> Path:
+    return webp.with_name(f"{webp.stem}-thumb.{spec.fmt}")
+
+def ladder_path(webp: Path, px: int, spec: ThumbSpec = DEFAULT_THUMB) -> Path:
+    """The primary thumbnail doubles as the ladder rung of the same size."""
+    if (px, px) == spec.size:
+        return thumb_path(webp, spec)
+    return webp.with_name(f"{webp.stem}-thumb-{px}.{spec.fmt}")
+
+def ladder_for(spec: ThumbSpec, crop: Tuple[int, int]) -> List[int]:
+    """
+    Rungs worth rendering for a source whose alpha crop is `crop`:
+    thumbnails never upscale, so a box at or above the crop's longer side
+    would only repeat the crop at full size. The primary thumbnail is
+    always kept.
+    """
+    return [px for px in spec.ladder_px() if px < max(crop) or (px, px) == spec.size]
+
+def drop_heavy_rungs(made: Dict[Path, Tuple[int, int]], primary: Path,
+                     limit: int) -> Dict[Path, Tuple[int, int]]:
+    """Rungs that came out bigger than the source file (`limit`) aren't worth shipping."""
+    for path in list(made):
+        if path != primary and path.stat().st_size > limit:
+            path.unlink()
+            del made[path]
+    return made
+
+THUMB_NAME = re.compile(rf"-thumb(-\d+)?\.({'|'.join(THUMB_FORMATS)})$")
+
+def is_source_webp(name: str) -> bool:
+    """Sticker sources only – `--thumb-format webp` thumbnails share the suffix."""
+    return name.endswith(".webp") and not THUMB_NAME.search(name)
+
+def thumb_files(webp: Path) -> List[Path]:
+    """Every thumbnail of `webp` on disk, in any format or size."""
+    ours = re.compile(rf"{re.escape(webp.stem)}{THUMB_NAME.pattern}")
+    return [p for p in webp.parent.iterdir() if ours.fullmatch(p.name)] \
+        if webp.parent.is_dir() else []
+
+Timeline = List[Tuple[int, Optional[Tuple[int, int, int, int]]]]   # (ms, alpha bbox) per frame
+
+def crop_size(size: Tuple[int, int], boxes: Iterable[Optional[Tuple[int, int, int, int]]]) -> Tuple[int, int]:
+    """Size of the union of alpha bboxes (None = empty frame); `size` if all are empty."""
+    boxes = [b for b in boxes if b]
+    if not boxes:
+        return size
+    return (max(b[2] for b in boxes) - min(b[0] for b in boxes),
+            max(b[3] for b in boxes) - min(b[1] for b in boxes))
+
+def scan_frames(im: Image.Image) -> Timeline:
+    """
+    Stream every frame once, keeping only its duration and alpha bbox –
+    never more than one decoded frame in memory.
+    """
+    out: Timeline = []
+    for frame in ImageSequence.Iterator(im):
+        out.append((int(frame.info.get("duration", 0) or 0),
+                    frame.convert("RGBA").getchannel("A").getbbox()))
+    im.seek(0)
+    return out
+
+def sample_frames(durations: List[int], max_frames: int,
+                  max_fps: float) -> List[Tuple[int, int]]:
+    """
+    Pick frames so the output has ≤ max_frames frames and ≤ max_fps; each
+    pick lasts until the next one starts, so total duration is kept.
+    → [(frame index, output duration ms)]
+    """
+    durations = [d or 100 for d in durations]        # 0 ms → browsers use ~100
+    total = sum(durations)
+    slot = max(1000.0 / max_fps, total / max(max_frames, 1))
+    starts, t = [], 0
+    for d in durations:
+        starts.append(t)
+        t += d
+    picks: List[int] = []
+    next_t = 0.0
+    for i, start in enumerate(starts):
+        if start >= next_t and len(picks) < max_frames:
+            picks.append(i)
+            next_t += slot
+            while next_t <= start:
+                next_t += slot
+    ends = [starts[j] for j in picks[1:]] + [total]
+    return [(i, max(1, end - starts[i])) for i, end in zip(picks, ends)]
+
+def fit(crop: Image.Image, box: Tuple[int, int]) -> Image.Image:
+    """Box‑reduce while ≥ 2× the target, then LANCZOS into `box`."""
+    tw, th = box
+    factor = min(crop.width // tw, crop.height // th) // 2
+    out = crop.reduce(factor) if factor > 1 else crop.copy()
+    out.thumbnail((tw, th), Image.LANCZOS)
+    return out
+
+def render_thumbs(src: Path, targets: Sequence[Tuple[Path, Tuple[int, int]]],
+                  spec: ThumbSpec = DEFAULT_THUMB,
+                  timeline: Optional[Timeline] = None) -> List[Tuple[int, int]]:
+    """
+    Decode `src` once, crop to the alpha bbox and write one downscaled
+    image per (dest, box) target; returns the output dimensions in order.
+    Decoders that support it (JPEG) draft at reduced scale, and a cheap
+    integer `reduce()` runs first while the crop is still ≥ 2× a target,
+    so LANCZOS only ever sees a small image. Animated sources go through
+    `render_animated` (pass `timeline` if it was already scanned).
+    """
+    if not targets:
+        return []
+    mw = max(b[0] for _, b in targets)
+    mh = max(b[1] for _, b in targets)
+    with Image.open(src) as src_im:
+        if is_animated_webp(src_im):
+            return render_animated(src_im, targets, spec, timeline or scan_frames(src_im))
+        src_im.draft(None, (mw * 2, mh * 2))
+        im = src_im.convert("RGBA")
+    return render_static(im, targets, spec)
+
+def render_static(im: Image.Image, targets: Sequence[Tuple[Path, Tuple[int, int]]],
+                  spec: ThumbSpec = DEFAULT_THUMB) -> List[Tuple[int, int]]:
+    """Thumbnails from an already decoded RGBA image (see render_thumbs)."""
+    bbox = im.getchannel("A").getbbox() or (0, 0) + im.size
+    crop = im.crop(bbox)
+
+    sizes = []
+    for dest, box in targets:
+        out = fit(crop, box)
         dest.parent.mkdir(parents=True, exist_ok=True)
-        im.save(dest, "PNG")
+        out.save(dest, THUMB_FORMATS[spec.fmt], **spec.save_args())
+        sizes.append(out.size)
+    return sizes
+
+def render_animated(im: Image.Image, targets: Sequence[Tuple[Path, Tuple[int, int]]],
+                    spec: ThumbSpec, timeline: Timeline) -> List[Tuple[int, int]]:
+    """
+    Animated thumbnails from sampled frames: crop every pick to the union
+    alpha bbox of the picks, downscale per target and keep only those
+    small frames; source frames are streamed, not materialised.
+    """
+    picks = sample_frames([d for d, _ in timeline], spec.max_frames, spec.max_fps)
+    boxes = [timeline[i][1] for i, _ in picks if timeline[i][1]]
+    if boxes:
+        bbox = (min(b[0] for b in boxes), min(b[1] for b in boxes),
+                max(b[2] for b in boxes), max(b[3] for b in boxes))
+    else:
+        bbox = (0, 0) + im.size
+    wanted = dict(picks)
+    frames: List[List[Image.Image]] = [[] for _ in targets]
+    for i, frame in enumerate(ImageSequence.Iterator(im)):
+        if i in wanted:
+            crop = frame.convert("RGBA").crop(bbox)
+            for out, (_, box) in zip(frames, targets):
+                out.append(fit(crop, box))
+        if i >= picks[-1][0]:
+            break
+
+    durations = [d for _, d in picks]
+    sizes = []
+    for out, (dest, _) in zip(frames, targets):
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        out[0].save(dest, THUMB_FORMATS[spec.fmt], save_all=True, append_images=out[1:],
+                    duration=durations, loop=0, **spec.save_args(animated=True))
+        sizes.append(out[0].size)
+    return sizes
+
+def smart_thumbnail(src: Path, dest: Path, size: Tuple[int,int]=(128,128),
+                    spec: Optional[ThumbSpec] = None) -> Tuple[int, int]:
+    """Crop to the alpha bbox and downscale to fit `size`; → output size."""
+    spec = spec or ThumbSpec(size=size)
+    return render_thumbs(src, [(dest, spec.size)], spec)[0]
+
+def is_bad_thumb(webp: Path, spec: ThumbSpec = DEFAULT_THUMB) -> bool:
+    """
+    Missing, unreadable, larger than the target box, or with a ladder
+    rung heavier than the source. The primary thumbnail ships whatever it
+    weighs (see drop_heavy_rungs), so only its box is checked; missing
+    rungs are left to the build – a rung may be skipped on purpose.
+    """
+    thumb = thumb_path(webp, spec)
+    if not thumb.exists():
+        return True
+    limit = webp.stat().st_size
+    for px in spec.ladder_px():
+        path = ladder_path(webp, px, spec)
+        if path != thumb and path.exists() and path.stat().st_size > limit:
+            return True
+    try:
+        with Image.open(thumb) as im:
+            return im.width > spec.size[0] or im.height > spec.size[1]
+    except Exception:
+        return True
 
-# ── virality & pricing (unchanged) ─────────────────────────────────────
-vision_client = vision.ImageAnnotatorClient()
+def rebuild_thumb(spec: ThumbSpec, webp: Path) -> Tuple[int, int]:
+    """
+    Regenerate one sticker's thumbnail and ladder from a single decode,
+    dropping other‑format siblings. → (old, new) bytes.
+    """
+    old = 0
+    for path in thumb_files(webp):
+        old += path.stat().st_size
+        path.unlink()
+    primary = thumb_path(webp, spec)
+    targets = {primary: spec.size}
+    with Image.open(webp) as im:                # one decode sizes the ladder and renders it
+        if is_animated_webp(im):
+            timeline = scan_frames(im)
+            crop = crop_size(im.size, (b for _, b in timeline))
+            render = lambda todo: render_animated(im, todo, spec, timeline)
+        else:
+            rgba = im.convert("RGBA")
+            crop = crop_size(im.size, [rgba.getchannel("A").getbbox()])
+            render = lambda todo: render_static(rgba, todo, spec)
+        targets.update({ladder_path(webp, px, spec): (px, px) for px in ladder_for(spec, crop)})
+        made = dict(zip(targets, render(list(targets.items()))))
+    made = drop_heavy_rungs(made, primary, webp.stat().st_size)
+    return old, sum(p.stat().st_size for p in made)
+
+def regenerate_thumbs(webps: List[Path], spec: ThumbSpec, jobs: int) -> None:
+    bad = [w for w in webps if is_bad_thumb(w, spec)]
+    logging.info("Regenerating %d of %d thumbnail(s)", len(bad), len(webps))
+    fn = functools.partial(measured, rebuild_thumb, spec)
+    with stage_pools(jobs) as (cpu, _):
+        sizes = []
+        for size, snap in ordered_map(cpu, fn, bad, max(jobs, 1) * 4):
+            METRICS.merge(snap)
+            sizes.append(size)
+    before, after = sum(o for o, _ in sizes), sum(n for _, n in sizes)
+    logging.info("Thumbnails: %d → %d bytes", before, after)
+    print(f"🖼  Rebuilt {len(bad)} thumbnail(s): {before:,} → {after:,} bytes")
+
+# ── source re‑encoding (--optimize-sources) ────────────────────────────
+def optimize_sources(webps: List[Path], store: JsonlStore, jobs: int,
+                     min_ssim: float = MIN_SSIM, qrange: Tuple[int, int] = QUALITY_RANGE,
+                     budget_bpp: float = 0.0, scores: Optional[JsonlStore] = None,
+                     build: Optional[JsonlStore] = None,
+                     digests: Optional[Dict[Path, str]] = None) -> Set[Path]:
+    """
+    Re‑encode every source not yet decided on; → the files rewritten.
+    Score and build‑cache records are copied to the new hash – the picture
+    is the same, only its bytes changed – so nothing is re‑scored.
+    `digests` (content hashes already known) is completed and follows
+    rewritten files to their new hash.
+    """
+    digests = digests if digests is not None else {}
+    with METRICS.timer("optimize.hash", files=len(webps)):
+        for w in webps:
+            if w not in digests:
+                digests[w] = file_digest(w)
+    key = lambda digest: f"v{OPTIMIZE_VERSION}:{digest}"
+    todo = [w for w in webps if key(digests[w]) not in store]
+    METRICS.count("cache.optimize.hit", len(webps) - len(todo))
+    METRICS.count("cache.optimize.miss", len(todo))
+    fn = functools.partial(measured, optimize_source, min_ssim=min_ssim,
+                           qrange=qrange, budget_bpp=budget_bpp)
+    rewritten: Set[Path] = set()
+    before = after = 0
+    with stage_pools(jobs) as (cpu, _):
+        for webp, (rec, snap) in zip(todo, ordered_map(cpu, fn, todo, max(jobs, 1) * 4)):
+            METRICS.merge(snap)
+            old = digests[webp]
+            store.put(key(old), rec)
+            if "skip" in rec:
+                METRICS.count(f"optimize.skip.{rec['skip']}")
+                continue
+            store.put(key(rec["digest"]), {"from": old})
+            new = digests[webp] = rec["digest"]
+            if scores is not None and scores.get(old) is not None:
+                scores.put(new, scores.get(old))
+            if build is not None and build.get(cache_key(old)) is not None:
+                build.put(cache_key(new), build.get(cache_key(old)))
+            rewritten.add(webp)
+            before += rec["before"]
+            after += rec["after"]
+    METRICS.count("optimize.saved_bytes", before - after)
+    logging.info("Sources: %d re‑encoded, %d → %d bytes", len(rewritten), before, after)
+    if rewritten:
+        print(f"🗜  Re‑encoded {len(rewritten)} source(s): {before:,} → {after:,} bytes "
+              f"({before - after:,} saved)")
+    return rewritten
+
+# ── virality & pricing ─────────────────────────────────────────────────
 GEM_PROMPT = (
     "Rate the internet popularity of this sticker image on a 1‑4 integer scale "
     "(1 = niche, 4 = extremely viral). Respond with just the number.")
-gem_model = genai.GenerativeModel("gemini-1.5-pro-latest")
+GEM_MODEL = "gemini-1.5-pro-latest"
+
+_clients: Dict[str, object] = {}
+_clients_lock = threading.Lock()
+
+def get_vision_client():
+    """ImageAnnotatorClient, created (with its credentials lookup) on first use."""
+    with _clients_lock:
+        if "vision" not in _clients:
+            import google.cloud.vision as vision
+            _clients["vision"] = vision.ImageAnnotatorClient()
+        return _clients["vision"]
+
+def get_gem_model():
+    with _clients_lock:
+        if "gemini" not in _clients:
+            import google.generativeai as genai
+            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+            _clients["gemini"] = genai.GenerativeModel(GEM_MODEL)
+        return _clients["gemini"]
+
+def vision_features() -> List[Dict]:
+    import google.cloud.vision as vision
+    return [{"type_": vision.Feature.Type.WEB_DETECTION, "max_results": 1}]
 
-def vision_score(img: Path) -> int|None:
+VISION_API = Backend("vision", VISION_QPS, burst=MAX_BATCH_SIZE, concurrency=VISION_CONCURRENCY)
+GEMINI_API = Backend("gemini", GEMINI_QPS, concurrency=GEMINI_CONCURRENCY)
+
+class LimitedVisionClient:
+    """Routes batch RPCs through VISION_API; cost = images in the batch."""
+
+    def __init__(self, client=None):
+        self.client = client
+
+    def batch_annotate_images(self, requests: List[Dict]):
+        if self.client is None:
+            self.client = get_vision_client()
+        return VISION_API.call(self.client.batch_annotate_images,
+                               requests=requests, cost=len(requests))
+
+vision_batcher: VisionBatcher[Path] = VisionBatcher(LimitedVisionClient(), vision_features)
+
+def asset_bytes(img: Path, buffers: Optional[Dict[Path, bytes]] = None) -> bytes:
+    """The loader's shared buffer for `img` if it kept one, else a read."""
+    data = buffers.get(img) if buffers is not None else None
+    return data if data is not None else img.read_bytes()
+
+def vision_results(imgs: List[Path],
+                   buffers: Optional[Dict[Path, bytes]] = None) -> Dict[Path, BatchResult]:
+    """Batched web detection; errors are logged and left on the result."""
+    METRICS.count("vision.images", len(imgs))
+    with METRICS.timer("vision", images=len(imgs)):
+        results = vision_batcher.annotate([(img, asset_bytes(img, buffers)) for img in imgs])
+    for img in imgs:
+        if results[img].error is not None:
+            logging.warning("Vision error %s: %s", img.name, results[img].error)
+    return results
+
+def gemini_fallback(img: Path, data: Optional[bytes] = None) -> Optional[int]:
+    """
+    Gemini tier 1‑4, or None if Gemini failed or gave no tier – never a
+    made‑up score; raises Deferred when the API keeps throttling.
+    """
     try:
-        with img.open("rb") as f:
-            content = f.read()
-        resp = vision_client.web_detection({"content": content}, max_results=1)
-        return len(resp.web_detection.pages_with_matching_images)
+        with METRICS.timer("gemini", file=img.name):
+            rsp = GEMINI_API.call(
+                get_gem_model().generate_content,
+                [GEM_PROMPT, data if data is not None else img.read_bytes()],
+                generation_config={"response_mime_type": "text/plain"})
+        found = re.search(r"[1-4]", rsp.text or "")
+    except Deferred:
+        raise
     except Exception as e:
-        logging.warning("Vision error %s", e)
+        logging.warning("Gemini error %s: %s", img.name, e)
         return None
-
-def gemini_fallback(img: Path) -> int:
-    try:
-        rsp = gem_model.generate_content(
-            [GEM_PROMPT, img.read_bytes()],
-            generation_config={"response_mime_type": "text/plain"})
-        return int(re.search(r"[1-4]", rsp.text).group())
-    except Exception:
-        return 1
+    if found is None:
+        logging.warning("Gemini gave no tier for %s: %r", img.name, rsp.text[:80])
+        return None
+    return int(found.group())
 
 def virality_to_tier(matches: int|None) -> int:
     if matches is None: return 1
@@ -85,33 +551,83 @@ def virality_to_tier(matches: int|None) -> int:
 
 PRICE_MAP = {1: 1.00, 2: 3.00, 3: 5.00, 4: 10.00}
 
-# ── CSV helpers (unchanged) ────────────────────────────────────────────
+def score_tier(rec: Dict) -> int:
+    """Tier for a stored score record: Vision first, Gemini for tier 1."""
+    tier = virality_to_tier(rec["matches"])
+    if tier == 1 and rec.get("gemini"):
+        tier = rec["gemini"]
+    return tier
+
+# ── CSV helpers ────────────────────────────────────────────────────────
 CSV_HEADER = [
     "Handle", "Title", "Body (HTML)", "Vendor", "Type", "Tags", "Published",
     "Option1 Name", "Option1 Value",
     "Variant SKU", "Variant Price", "Variant Requires Shipping",
     "Variant Taxable", "Image Src"
 ]
+CSV_CHECKPOINT = 100            # flush after this many upserts
+TAGS_COL = CSV_HEADER.index("Tags")
 
 def init_csv() -> None:
     if not CSV_PATH.exists():
         CSV_PATH.write_text(",".join(CSV_HEADER) + "\n", encoding="utf-8")
 
-def append_or_update_csv(row: List[str]) -> None:
-    rows: List[List[str]] = []
-    if CSV_PATH.exists():
-        rows = list(csv.reader(CSV_PATH.open(encoding="utf-8")))
-    header = rows[0] if rows else CSV_HEADER
-    body   = rows[1:] if rows else []
-    # replace or append
-    replaced = False
-    for r in body:
-        if r and r[0] == row[0]:
-            r[:] = row; replaced = True; break
-    if not replaced:
-        body.append(row)
-    with CSV_PATH.open("w", newline="", encoding="utf-8") as f:
-        csv.writer(f).writerows([header] + body)
+class CatalogWriter:
+    """
+    product_catalog.csv held in memory with a handle → row index. Upserts
+    keep existing row order (new handles append); `flush()` rewrites the
+    file once via temp‑file + rename, and every `checkpoint` upserts it
+    flushes anyway so a crash loses little.
+    """
+
+    def __init__(self, path: Optional[Path] = None, checkpoint: int = CSV_CHECKPOINT):
+        self.path = path = path or CSV_PATH
+        self.checkpoint = checkpoint
+        rows: List[List[str]] = []
+        if path.exists():
+            with path.open(encoding="utf-8", newline="") as f:
+                rows = list(csv.reader(f))
+        self.header = rows[0] if rows else CSV_HEADER
+        self.body   = rows[1:] if rows else []
+        self.index: Dict[str, int] = {}
+        for i, r in enumerate(self.body):
+            if r:
+                self.index.setdefault(r[0], i)
+        self.pending = 0
+
+    def upsert(self, row: List[str]) -> None:
+        i = self.index.get(row[0])
+        if i is None:
+            self.index[row[0]] = len(self.body)
+            self.body.append(row)
+        elif self.body[i] == row:
+            return
+        else:
+            self.body[i] = row
+        self.pending += 1
+        if self.checkpoint and self.pending % self.checkpoint == 0:
+            self.flush()
+
+    def remove(self, handle: str) -> bool:
+        """Delete every row of `handle`; → whether there was one."""
+        if handle not in self.index:
+            return False
+        self.body = [r for r in self.body if not r or r[0] != handle]
+        self.index = {}
+        for i, r in enumerate(self.body):
+            if r:
+                self.index.setdefault(r[0], i)
+        self.pending += 1
+        return True
+
+    def flush(self) -> None:
+        if not self.pending and self.path.exists():
+            return
+        with METRICS.timer("csv.flush", rows=len(self.body)):
+            buf = io.StringIO()
+            csv.writer(buf).writerows([self.header] + self.body)
+            atomic_write_text(self.path, buf.getvalue())
+        self.pending = 0
 
 # ── NEW: ensure each sticker has its own folder ────────────────────────
 def ensure_foldered(webp: Path) -> Path:
@@ -129,30 +645,125 @@ def ensure_foldered(webp: Path) -> Path:
     return dest
 
 # ── core processing ────────────────────────────────────────────────────
-def process_webp(webp: Path) -> Dict:
-    with Image.open(webp) as im:
-        w, h = im.size
-        animated = is_animated_webp(im)
+class Decoded(NamedTuple):
+    width: int
+    height: int
+    animated: bool
+    thumb: str                         # primary thumbnail file name
+    thumbs: List[Dict]                 # ladder: [{w, h, bytes, file}], smallest first
+    dhash: Optional[str] = None        # 64‑bit perceptual hash, hex
+    frames: int = 1                    # animated: source frame count …
+    duration: int = 0                  # … and total duration in ms
+    rungs: Tuple[int, ...] = ()        # ladder px of each `thumbs` entry
 
-    thumb = webp.with_name(f"{webp.stem}-thumb.png")
-    if not thumb.exists():
-        smart_thumbnail(webp, thumb)
+def thumb_info(path: Path, size: Optional[Tuple[int, int]] = None) -> Dict:
+    if size is None:
+        with Image.open(path) as im:   # header only
+            size = im.size
+    return {"w": size[0], "h": size[1], "bytes": path.stat().st_size, "file": path.name}
 
-    matches = vision_score(webp)
-    tier    = virality_to_tier(matches)
-    if tier == 1:
-        tier = gemini_fallback(webp)
+def decode_stage(webp: Path, spec: ThumbSpec = DEFAULT_THUMB, render: bool = True,
+                 source: Optional[Path] = None, force: bool = False,
+                 data: Optional[bytes] = None) -> Decoded:
+    """
+    CPU‑bound: probe dimensions/animation from the RIFF header, decode
+    once for the dHash and every missing thumbnail (with `render` off,
+    only list the ones already on disk). `data` is the loader's buffer
+    of `webp`, read here if not given. Thumbnails are cut from `source`
+    (a background‑removed copy) when given; `force` re‑renders those
+    already on disk.
+    """
+    if data is None:
+        data = load_asset(webp).data
+    thumb = thumb_path(webp, spec)
+
+    with Image.open(io.BytesIO(data)) as im:
+        with METRICS.timer("decode", file=webp.name):
+            try:
+                info = probe_webp(data)
+                w, h, animated = info.width, info.height, info.animated and is_animated_webp(im)
+            except ValueError:
+                w, h = im.size
+                animated = is_animated_webp(im)
+            if animated:
+                phash = to_hex(dhash(im))
+                timeline: Optional[Timeline] = scan_frames(im)
+                rgba = None
+                crop = crop_size((w, h), (b for _, b in timeline))
+            else:
+                rgba = im.convert("RGBA")          # the one decode, shared below
+                phash = to_hex(dhash(rgba))
+                timeline = None
+                crop = crop_size((w, h), [rgba.getchannel("A").getbbox()])
+        rungs = ladder_for(spec, crop)
+        wanted = {thumb: spec.size}
+        wanted.update({ladder_path(webp, px, spec): (px, px) for px in rungs})
+        todo = [(p, box) for p, box in wanted.items() if render and (force or not p.exists())]
+        with METRICS.timer("thumbnail", file=webp.name, count=len(todo)):
+            if source is not None:
+                sizes = render_thumbs(source, todo, spec)
+            elif animated:
+                sizes = render_animated(im, todo, spec, timeline) if todo else []
+            else:
+                sizes = render_static(rgba, todo, spec) if todo else []
+        made = drop_heavy_rungs(dict(zip((p for p, _ in todo), sizes)), thumb, len(data))
+
+    listed = []
+    for px in spec.ladder_px():
+        path = ladder_path(webp, px, spec)
+        if path in made or (path in wanted and (path, wanted[path]) not in todo and path.exists()):
+            listed.append(px)
+        elif render and path not in wanted:
+            path.unlink(missing_ok=True)       # from a ladder this source no longer gets
+    thumbs = [thumb_info(p, made.get(p)) for p in (ladder_path(webp, px, spec) for px in listed)]
+    frames, duration = (len(timeline), sum(d for d, _ in timeline)) if timeline else (1, 0)
+    return Decoded(w, h, animated, thumb.name, thumbs, phash, frames, duration, tuple(listed))
+
+def score_batch(webps: List[Path],
+                buffers: Optional[Dict[Path, bytes]] = None) -> List[Optional[Dict]]:
+    """
+    Network‑bound: one batched Vision call, Gemini fallback for tier 1.
+    A record is only made from a clean Vision answer (plus a Gemini tier
+    where one is needed); None means the sticker wasn't scored – it is
+    retried later and otherwise keeps its previous score, never priced
+    from a failure. Image bytes come from `buffers` where present.
+    """
+    results = vision_results(webps, buffers)
+    out: List[Optional[Dict]] = []
+    for webp in webps:
+        r = results[webp]
+        if r.error is not None:
+            out.append(None)
+            continue
+        gemini = None
+        if virality_to_tier(r.matches) == 1:
+            try:
+                gemini = gemini_fallback(webp, asset_bytes(webp, buffers))
+            except Deferred as e:
+                logging.warning("Gemini deferred %s: %s", webp.name, e)
+            if gemini is None:
+                out.append(None)
+                continue
+        out.append({"matches": r.matches, "gemini": gemini, "scoredAt": time.time()})
+    return out
+
+def build_entry(webp: Path, decoded: Decoded, tier: int) -> Tuple[Dict, List[str]]:
     price = PRICE_MAP[tier]
 
     entry = {
         "id": webp.stem,
         "name": webp.stem.replace("-", " ").title(),
         "file": webp.name,
-        "width": w, "height": h, "animated": animated,
+        "width": decoded.width, "height": decoded.height, "animated": decoded.animated,
         "defaultPosition": {"x": 0.5, "y": 0.5},
-        "thumb": thumb.name,
+        "thumb": decoded.thumb,
         "viralityTier": tier, "priceUSD": price
     }
+    if decoded.thumbs:
+        entry["thumbs"] = decoded.thumbs
+    if decoded.animated:               # lets clients decide whether to autoplay
+        entry.update(frames=decoded.frames, durationMs=decoded.duration,
+                     bytes=webp.stat().st_size)
 
     csv_row = [
         slug(webp.stem),
@@ -161,32 +772,937 @@ def process_webp(webp: Path) -> Dict:
         f"{price:.2f}", "FALSE", "FALSE",
         f"https://store.cbb.homes/images/{webp.name}"
     ]
-    append_or_update_csv(csv_row)
-    return entry
+    return entry, csv_row
+
+def js_numbers(obj):
+    """Integral floats as ints, the way JSON.stringify prints them."""
+    if isinstance(obj, float) and obj.is_integer():
+        return int(obj)
+    if isinstance(obj, dict):
+        return {k: js_numbers(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [js_numbers(v) for v in obj]
+    return obj
+
+class ManifestWriter:
+    """
+    Collects manifest entries per sticker folder and commits them in one
+    go: a manifest is rewritten (atomically) only when its text changes,
+    then index.json – first entry of every sticker folder, in folder
+    order, formatted like build_index.ts – its binary twin index.bin and
+    the search.json index are regenerated from the caller's in‑memory
+    entries; no other manifest is opened.
+    """
+
+    def __init__(self, packs: Optional[Path] = None):
+        self.packs = packs or PACKS
+        self.folders: Dict[Path, Dict[str, Dict]] = {}
+        self.original: Dict[Path, Optional[str]] = {}
+        self.dirty: set = set()
+        self.tags: Dict[str, List[str]] = {}
+        self.index: List[Dict] = []            # last committed index.json entries
+
+    def _load(self, folder: Path) -> Dict[str, Dict]:
+        if folder not in self.folders:
+            path = folder / "manifest.json"
+            text = path.read_text(encoding="utf-8") if path.exists() else None
+            self.original[folder] = text
+            self.folders[folder] = {e["id"]: e for e in json.loads(text)} if text else {}
+        return self.folders[folder]
+
+    def get(self, webp: Path) -> Optional[Dict]:
+        return self._load(webp.parent).get(webp.stem)
+
+    def put(self, webp: Path, entry: Dict, tags: Sequence[str] = ()) -> None:
+        self._load(webp.parent)[webp.stem] = entry
+        self.dirty.add(webp.parent)
+        if tags:
+            self.tags[webp.stem] = list(tags)
+
+    def remove(self, webp: Path) -> bool:
+        """Drop a deleted sticker's entry; → whether it had one."""
+        if self._load(webp.parent).pop(webp.stem, None) is None:
+            return False
+        self.dirty.add(webp.parent)
+        return True
+
+    def commit(self, stickers: Optional[Dict[Path, Dict]] = None,
+               index_path: Optional[Path] = None) -> int:
+        """
+        Write changed manifests and, given every sticker's entry (source
+        path → entry), index.json and its twins; → manifests written.
+        """
+        written = 0
+        for folder in sorted(self.dirty):
+            entries = self.folders[folder]
+            if not entries:
+                # last sticker of the folder is gone – so is its manifest
+                if self.original[folder] is not None:
+                    (folder / "manifest.json").unlink(missing_ok=True)
+                    self.original[folder] = None
+                    written += 1
+                    logging.info("Removed %s", folder / "manifest.json")
+                continue
+            text = json.dumps(sorted(entries.values(), key=lambda x: x["id"]),
+                              indent=2, ensure_ascii=False)
+            if text != self.original[folder]:
+                atomic_write_text(folder / "manifest.json", text)
+                self.original[folder] = text
+                written += 1
+                logging.info("Updated %s", folder / "manifest.json")
+        self.dirty.clear()
+
+        if stickers is None:
+            return written
+        first: Dict[Path, Dict] = {}
+        for webp, entry in stickers.items():
+            if webp.parent not in first or entry["id"] < first[webp.parent]["id"]:
+                first[webp.parent] = entry
+        index = [first[folder] for folder in sorted(first, key=lambda f: f.name)]
+        index_path = index_path or INDEX_PATH
+        self.index = index = js_numbers(index)
+        text = json.dumps(index, indent=2, ensure_ascii=False)
+        if not index_path.exists() or index_path.read_text(encoding="utf-8") != text:
+            atomic_write_text(index_path, text)
+            logging.info("Updated %s (%d entries)", index_path, len(index))
+        bin_path = index_path.with_suffix(".bin")
+        data = encode_index(index)
+        if not bin_path.exists() or bin_path.read_bytes() != data:
+            atomic_write_bytes(bin_path, data)
+            logging.info("Updated %s (%d bytes)", bin_path, len(data))
+        search_path = index_path.with_name("search.json")
+        text = dump_search_index(build_search_index(index, self.tags))
+        if not search_path.exists() or search_path.read_text(encoding="utf-8") != text:
+            atomic_write_text(search_path, text)
+            logging.info("Updated %s", search_path)
+        return written
+
+# ── pipelined mode (--jobs N) ──────────────────────────────────────────
+def ordered_map(pool: Optional[Executor], fn: Callable, items: Iterable,
+                window: int) -> Iterator:
+    """
+    Yield `fn(item)` for every item in *input* order. With a pool, keep at
+    most `window` calls in flight; without one, call lazily in the caller.
+    """
+    if pool is None:
+        for item in items:
+            yield fn(item)
+        return
+    pending: List[Future] = []
+    it = iter(items)
+    for item in it:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            break
+    while pending:
+        head = pending.pop(0)
+        nxt = next(it, None)
+        if nxt is not None:
+            pending.append(pool.submit(fn, nxt))
+        yield head.result()
+
+@contextlib.contextmanager
+def stage_pools(jobs: int) -> Iterator[Tuple[Optional[Executor], Optional[Executor]]]:
+    """(cpu, net) executors for decode and scoring; (None, None) when serial."""
+    if jobs <= 1:
+        yield None, None
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as cpu, \
+         ThreadPoolExecutor(max_workers=jobs) as net:
+        yield cpu, net
+
+# ── incremental build cache + score store ──────────────────────────────
+def cache_key(digest: str) -> str:
+    return f"v{PIPELINE_VERSION}:{digest}"
+
+def cached_decode(webp: Path, rec: Optional[Dict],
+                  spec: ThumbSpec = DEFAULT_THUMB, bg: bool = False) -> Optional[Decoded]:
+    """
+    A cache record is only usable if it covers the configured ladder,
+    was rendered from the same source (original vs. cutout) and every
+    thumbnail it lists is still on disk with the recorded size – one
+    rebuilt by `--regenerate-thumbs` (or by hand) voids the record.
+    """
+    if rec is None or bool(rec.get("bg")) != bg:
+        return None
+    thumb = thumb_path(webp, spec)
+    if not thumb.exists():
+        return None
+    rungs = rec.get("thumbs", [])
+    if rec.get("ladder") != spec.ladder_px():
+        return None
+    thumbs = []
+    for r in rungs:
+        path = ladder_path(webp, r["px"], spec)
+        try:
+            if path.stat().st_size != r["bytes"]:
+                return None
+        except FileNotFoundError:
+            return None
+        thumbs.append({"w": r["w"], "h": r["h"], "bytes": r["bytes"], "file": path.name})
+    return Decoded(rec["width"], rec["height"], rec["animated"], thumb.name, thumbs,
+                   rec.get("dhash"), rec.get("frames", 1), rec.get("duration", 0),
+                   tuple(r["px"] for r in rungs))
+
+def decode_job(spec: ThumbSpec, render: bool,
+               job: Tuple[Path, Optional[Path], bool, Optional[bytes]]) -> Decoded:
+    webp, source, force, data = job
+    return decode_stage(webp, spec, render, source, force, data)
+
+def decode_record(decoded: Decoded, spec: ThumbSpec = DEFAULT_THUMB, bg: bool = False) -> Dict:
+    """Name‑independent build‑cache record (twins share a content hash)."""
+    return {**({"bg": True} if bg else {}), "width": decoded.width, "height": decoded.height, "animated": decoded.animated,
+            "dhash": decoded.dhash, "frames": decoded.frames, "duration": decoded.duration,
+            "ladder": spec.ladder_px(),
+            "thumbs": [{"px": px, "w": t["w"], "h": t["h"], "bytes": t["bytes"]}
+                       for px, t in zip(decoded.rungs, decoded.thumbs)]}
+
+def plan_rescore(scores: JsonlStore, digests: List[str], ttl_days: Optional[float],
+                 budget: Optional[int], now: float) -> set:
+    """
+    Digests that need a scoring call this run: every unscored image, plus
+    the `budget` stalest entries older than `ttl_days` (all of them if
+    `budget` is None).
+    """
+    unique  = set(digests)
+    missing = {d for d in unique if scores.get(d) is None}
+    stale: List[Tuple[float, str]] = []
+    if ttl_days is not None:
+        cutoff = now - ttl_days * 86400
+        stale = sorted((scores.get(d)["scoredAt"], d) for d in unique - missing
+                       if scores.get(d)["scoredAt"] < cutoff)
+    if budget is not None:
+        stale = stale[:max(budget, 0)]
+    if stale:
+        logging.info("Re‑scoring %d stale entr(ies)", len(stale))
+    return missing | {d for _, d in stale}
+
+def run_stages(webps: List[Path], jobs: int, build: Optional[JsonlStore],
+               scores: Optional[JsonlStore], ttl_days: Optional[float] = SCORE_TTL_DAYS,
+               budget: Optional[int] = None,
+               retry_rounds: int = RETRY_ROUNDS,
+               spec: ThumbSpec = DEFAULT_THUMB, render: bool = True,
+               score: bool = True,
+               share_radius: Optional[int] = None,
+               cutouts: Optional[Dict[Path, Path]] = None,
+               hashes: Optional[Dict[Path, str]] = None,
+               known: Optional[Dict[str, int]] = None) -> Iterator[Tuple[Path, Decoded, Optional[int]]]:
+    """
+    Yield (webp, decoded, tier) in scan order. Decode/thumbnail results come
+    from `build` when the content hash matches, tiers from the `scores`
+    store unless the entry is missing or picked for refresh; only the rest
+    hit the decode (process) and scoring (thread) pools, so the serial
+    CSV/manifest writer stays deterministic. Stores of None disable caching.
+    Stickers whose scoring failed transiently are retried after the main
+    pass and yielded last. `render`/`score` off skip thumbnail writes and
+    API calls; unscored stickers then come back with a tier of None.
+    With `share_radius`, near‑duplicates (by dHash) share the score record
+    of one cluster member, preferring one that is already scored; cache
+    misses are then decoded before scoring is planned, so new stickers
+    join their clusters too; `known` adds the dHashes (by content hash)
+    of stickers outside `webps`, so a new copy can join a cluster that
+    was built in an earlier run.
+    `cutouts` maps stickers to background‑removed copies to render from;
+    switching a sticker between original and cutout re‑renders it.
+    `hashes` maps stickers to their content hash: entries passed in are
+    trusted, the rest are filled in as the stickers are read.
+    A sticker is read once, as it enters the decode or scoring window
+    (the same bounded window as ordered_map): that read yields its hash,
+    and its buffer is shared by both pools and dropped once the sticker
+    is yielded – memory follows the window, not the tree. Only the stale
+    entries among the given hashes compete for `budget`; under
+    `share_radius` a sticker both decoded and scored is read once more,
+    since clustering needs every dHash before anything is scored.
+    """
+    cutouts = cutouts if cutouts is not None else {}
+    digests = hashes if hashes is not None else {}
+    recs: Dict[Path, Optional[Dict]] = {}
+    hits: Dict[Path, Optional[Decoded]] = {}
+    sizes: Dict[Path, int] = {}
+    buffers: Dict[Path, bytes] = {}
+
+    def read(webp: Path) -> bytes:
+        with METRICS.timer("read", file=webp.name):
+            asset = load_asset(webp)
+        METRICS.count("asset.bytes", asset.size)
+        digests[webp], sizes[webp] = asset.digest, asset.size
+        return asset.data
+
+    def admit(webp: Path) -> Optional[bytes]:
+        """First sight of `webp`: hash it unless given, look it up; → bytes if read."""
+        if webp in hits:
+            return None
+        data = read(webp) if webp not in digests else None
+        recs[webp] = build.get(cache_key(digests[webp])) if build is not None else None
+        hits[webp] = cached_decode(webp, recs[webp], spec, webp in cutouts)
+        return data
+
+    def buffer(webp: Path) -> bytes:
+        """`webp`'s bytes, read as it enters a window and shared until yielded."""
+        if webp not in buffers:
+            buffers[webp] = read(webp)
+        return buffers[webp]
+
+    def size(webp: Path) -> int:
+        return sizes[webp] if webp in sizes else webp.stat().st_size
+
+    def redo(webp: Path) -> bool:
+        """Thumbnails on disk may come from the other source – redo them."""
+        return webp in cutouts or (recs[webp] is not None and bool(recs[webp].get("bg")))
+
+    window = jobs * 4
+    deferred: List[Tuple[Path, Decoded]] = []
+    with stage_pools(jobs) as (cpu, net):
+        def misses(queued: List[Path]) -> Iterator[Path]:
+            for w in webps:
+                data = admit(w)
+                if hits[w] is None:
+                    if data is not None:
+                        buffers[w] = data
+                    queued.append(w)
+                    yield w
+
+        def decode_all(todo: Iterator[Path]) -> Iterator[Tuple[Decoded, Dict]]:
+            # a generator, so queued buffers are only referenced by `buffers`
+            return ordered_map(cpu, functools.partial(measured, decode_job, spec, render),
+                               ((w, cutouts.get(w), redo(w), buffer(w)) for w in todo), window)
+
+        def settle(webp: Path, result: Tuple[Decoded, Dict]) -> Decoded:
+            decoded, snap = result
+            METRICS.merge(snap)
+            if build is not None and render:
+                build.put(cache_key(digests[webp]),
+                          decode_record(decoded, spec, webp in cutouts))
+            return decoded
+
+        queued: List[Path] = []
+        alias: Dict[str, str] = {}
+        if share_radius is not None and scores is not None:
+            # new stickers need their dHash before the clusters are known
+            for n, result in enumerate(decode_all(misses(queued))):
+                w = queued[n]
+                hits[w] = settle(w, result)
+                buffers.pop(w)             # read again if it gets scored
+            known = {**(known or {}),
+                     **{digests[w]: int(hits[w].dhash, 16) for w in webps if hits[w].dhash}}
+            for group in clusters(known, share_radius):
+                rep = min(group, key=lambda d: (scores.get(d) is None, d))
+                alias.update({d: rep for d in group})
+        if scores is not None:
+            key = lambda w: alias.get(digests[w], digests[w])
+        else:
+            key = lambda w: w
+
+        now = time.time()
+        rescore = plan_rescore(scores, [key(w) for w in webps if w in digests],
+                               ttl_days, budget, now) if score and scores is not None else set()
+
+        def due(k) -> bool:
+            if scores is None or k in rescore:
+                return True
+            rec = scores.get(k)                # hashed in the window: not in the plan
+            return rec is None or (budget is None and ttl_days is not None
+                                   and rec["scoredAt"] < now - ttl_days * 86400)
+
+        planned: Dict[Path, bool] = {}
+        todo_keys: Set = set()                 # one call per distinct image / cluster
+
+        def pending(webp: Path) -> bool:
+            """Whether `webp` is scored this run; decided in scan order, once admitted."""
+            if webp not in planned:
+                k = key(webp)
+                planned[webp] = score and k not in todo_keys and due(k)
+                if planned[webp]:
+                    todo_keys.add(k)
+            return planned[webp]
+
+        got: Dict = {}                         # records scored this run, by key
+
+        def keep(webp: Path, rec: Optional[Dict]) -> None:
+            if rec is not None:
+                got[key(webp)] = rec
+                if scores is not None:
+                    scores.put(key(webp), rec)
 
-def main() -> None:
-    init_csv()
+        def record(webp: Path) -> Optional[Dict]:
+            k = key(webp)
+            if k in todo_keys:
+                return got.get(k)
+            return scores.get(k) if scores is not None else None
 
-    # walk every .webp, foldering on the fly
-    for raw in PACKS.rglob("*.webp"):
+        def to_score() -> Iterator[Tuple[Path, int]]:
+            for w in webps:
+                data = admit(w)
+                if pending(w):
+                    if data is not None:
+                        buffers[w] = data
+                    yield w, size(w)
+
+        def score_all(todo: Iterable[Tuple[Path, int]]) -> Iterator[Optional[Dict]]:
+            def loaded() -> Iterator[List[Path]]:
+                for batch in vision_batcher.batches(todo):   # read as the window reaches it
+                    for w in batch:
+                        buffer(w)
+                    yield batch
+            return itertools.chain.from_iterable(
+                ordered_map(net, functools.partial(score_batch, buffers=buffers),
+                            loaded(), jobs * 2))
+
+        decoded_it = decode_all(misses(queued))
+        scored_it  = score_all(to_score())
+        for webp in webps:
+            data = admit(webp)                 # neither window got here yet
+            if data is not None and (hits[webp] is None or pending(webp)):
+                buffers[webp] = data
+            decoded = hits[webp]
+            if decoded is None:
+                decoded = settle(webp, next(decoded_it))
+            if pending(webp):
+                keep(webp, next(scored_it))
+            buffers.pop(webp, None)        # decoded and scored – retries re‑read
+            rec = record(webp)
+            if rec is None and not score:
+                yield webp, decoded, None
+                continue
+            if rec is None:                # transient failure → end of run
+                deferred.append((webp, decoded))
+                continue
+            yield webp, decoded, score_tier(rec)
+
+        misses_n, todo_n = len(queued), sum(planned.values())
+        logging.info("Build cache: %d hit(s), %d miss(es)", len(webps) - misses_n, misses_n)
+        METRICS.count("cache.build.hit", len(webps) - misses_n)
+        METRICS.count("cache.build.miss", misses_n)
+        if score and scores is not None:
+            METRICS.count("cache.score.hit", len(webps) - todo_n)
+            METRICS.count("cache.score.miss", todo_n)
+
+        # deferred retry queue: a few slower passes once the main run is done
+        for rnd in range(retry_rounds):
+            if not deferred:
+                break
+            logging.info("Retry round %d: %d deferred sticker(s)", rnd + 1, len(deferred))
+            time.sleep(RETRY_PAUSE * 2 ** rnd)
+            todo = list({key(w): w for w, _ in deferred}.values())
+            for webp, rec in zip(todo, score_all((w, size(w)) for w in todo)):
+                keep(webp, rec)
+                buffers.pop(webp, None)
+            still = []
+            for webp, decoded in deferred:
+                rec = record(webp)
+                if rec is None:
+                    still.append((webp, decoded))
+                else:
+                    yield webp, decoded, score_tier(rec)
+            deferred = still
+
+    # out of retries: fall back to a previous score, else leave it for next run
+    for webp, decoded in deferred:
+        rec = scores.get(key(webp)) if scores is not None else None
+        if rec is None:
+            logging.warning("Skipping %s: scoring deferred, no previous score", webp.name)
+            continue
+        logging.warning("Keeping stale score for %s: refresh deferred", webp.name)
+        yield webp, decoded, score_tier(rec)
+
+def report_duplicates(phashes: Dict[str, int], radius: int) -> None:
+    """Write near‑duplicate clusters (sticker ids) to DUPES_REPORT."""
+    groups = clusters(phashes, radius)
+    atomic_write_text(DUPES_REPORT, json.dumps(
+        {"radius": radius, "clusters": groups}, indent=2, ensure_ascii=False))
+    logging.info("Duplicates: %d cluster(s) covering %d sticker(s)",
+                 len(groups), sum(len(g) for g in groups))
+
+def int_list(text: str) -> Tuple[int, ...]:
+    return tuple(int(t) for t in text.split(",") if t.strip())
+
+def quality_range(text: str) -> Tuple[int, int]:
+    lo, hi = int_list(text)
+    if not 0 <= lo <= hi <= 100:
+        raise argparse.ArgumentTypeError(f"bad quality range: {text}")
+    return lo, hi
+
+def stage_list(text: str) -> Tuple[str, ...]:
+    stages = tuple(t.strip() for t in text.split(",") if t.strip())
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    return stages
+
+# ── build session (one‑shot run + --watch batches) ─────────────────────
+def snapshot_record(stat: Sequence[int], digest: str, dhash_hex: Optional[str],
+                    csv_row: List[str], entry: Dict) -> Dict:
+    return {"stat": list(stat), "digest": digest, "dhash": dhash_hex,
+            "tags": csv_row[TAGS_COL].split(","), "entry": entry}
+
+def snapshot_config(args: argparse.Namespace, spec: ThumbSpec) -> str:
+    """Settings that shape a sticker's output; a snapshot taken under others is void."""
+    cfg = {"pipeline": PIPELINE_VERSION, "stages": sorted(args.stages), "spec": asdict(spec)}
+    if args.remove_bg:
+        cfg["bg"] = args.bg_model
+    if args.optimize_sources:
+        cfg["optimize"] = [args.source_min_ssim, list(args.source_quality), args.source_bpp]
+    if args.share_cluster_scores:
+        cfg["share"] = args.dup_radius
+    return json.dumps(cfg, sort_keys=True)
+
+class BuildSession:
+    """
+    Stores and writers shared by the initial build and every watch batch.
+    `entries`/`phashes` cover the whole tree, so the dupes and atlas
+    stages stay complete when a batch only touches a few stickers.
+
+    Every finished sticker (and every deletion) is appended to JOURNAL
+    before it reaches the in‑memory writers; a successful commit empties
+    it. A run that dies in between leaves the journal behind, and
+    `--resume` replays it – CSV and manifests committed in one pass –
+    then skips those stickers if their files are unchanged.
+
+    The scan snapshot (SCAN_SNAPSHOT) maps every committed sticker to its
+    size/mtime, content hash, dHash, tags and manifest entry; `queue()`
+    diffs a fresh scan against it. Updates are held in `seen` and written
+    on commit, so the snapshot never runs ahead of the manifests.
+    """
+
+    def __init__(self, args: argparse.Namespace, spec: ThumbSpec):
+        self.args = args
+        self.spec = spec
+        self.stages = set(args.stages)
+        self.build  = None if args.no_cache else JsonlStore(BUILD_CACHE)
+        self.scores = None if args.no_cache else JsonlStore(SCORE_STORE)
+        self.catalog = CatalogWriter() if "csv" in self.stages else None
+        self.manifests = ManifestWriter()
+        self.entries: Dict[Path, Dict] = {}
+        self.phashes: Dict[str, int] = {}
+        self.journal = JsonlStore(JOURNAL)
+        self.bg = BackgroundRemover(CACHE_DIR, args.bg_model, args.bg_threads,
+                                    args.bg_workers, args.bg_batch) if args.remove_bg else None
+        self.optimized = JsonlStore(OPTIMIZE_STORE) if args.optimize_sources else None
+        self.rewritten: Set[Path] = set()
+        self.snapshot = None if args.no_cache else JsonlStore(SCAN_SNAPSHOT)
+        self.config = snapshot_config(args, spec)
+        self.seen: Dict[str, Optional[Dict]] = {}      # rel path → record, None = gone
+        self.reset = False
+        self.resumed: Dict[Path, Tuple[int, int]] = {}
+        if len(self.journal) and args.resume:
+            self.replay()
+        elif len(self.journal):
+            logging.warning("Discarding journal of an interrupted run (%d sticker(s)); "
+                            "use --resume to keep it", len(self.journal))
+            self.journal.clear()
+
+    def replay(self) -> None:
+        """Apply an interrupted run's journal and commit CSV + manifests."""
+        for rel, rec in self.journal.items():
+            webp = PACKS / rel
+            if rec.get("removed"):
+                self.seen[rel] = None
+                self._forget(webp)
+                continue
+            self._stage(webp, rec["entry"], rec["csv"], rec.get("dhash"))
+            self.resumed[webp] = tuple(rec["stat"])
+            if "digest" in rec:
+                self.seen[rel] = snapshot_record(rec["stat"], rec["digest"], rec["dhash"],
+                                                 rec["csv"], rec["entry"])
+        if self.catalog is not None:
+            self.catalog.flush()
+        if "manifest" in self.stages:
+            self.manifests.commit()
+        logging.info("Resumed %d journaled sticker(s)", len(self.resumed))
+        print(f"↩️  Resumed {len(self.resumed)} sticker(s) from the journal")
+
+    def _stage(self, webp: Path, entry: Dict, csv_row: List[str],
+               dhash_hex: Optional[str]) -> None:
+        if self.catalog is not None:
+            self.catalog.upsert(csv_row)
+        self.manifests.put(webp, entry, csv_row[TAGS_COL].split(","))
+        self.entries[webp] = entry
+        if dhash_hex:
+            self.phashes[webp.stem] = int(dhash_hex, 16)
+
+    def queue(self, stats: Dict[Path, Tuple[int, int]]) -> List[Path]:
+        """
+        Stickers (foldered, with their scanned size/mtime) that need the
+        stages: new or modified since the snapshot, or due for a re‑score.
+        Unchanged ones are restored from their snapshot record, snapshot
+        stickers no longer on disk are removed.
+        """
+        snap = self.snapshot
+        if snap is None:
+            return list(stats)
+        for rel, _ in list(snap.items()):
+            if rel != SNAPSHOT_CONFIG and PACKS / rel not in stats:
+                self.remove(PACKS / rel)
+        if (self.args.full_scan or self.args.regenerate_thumbs
+                or snap.get(SNAPSHOT_CONFIG) != {"text": self.config}):
+            self.reset = True
+            return list(stats)
+
+        cutoff = (time.time() - self.args.score_ttl * 86400
+                  if self.scores is not None and "score" in self.stages
+                  and self.args.score_ttl is not None else None)
+        todo = []
+        for webp, stat in stats.items():
+            rec = snap.get(str(webp.relative_to(PACKS)))
+            if rec is None or tuple(rec["stat"]) != stat:
+                todo.append(webp)
+            elif cutoff is not None and (self.scores.get(rec["digest"]) or {}).get("scoredAt", 0) < cutoff:
+                todo.append(webp)
+            elif not self._restore(webp, rec):
+                todo.append(webp)
+        METRICS.count("scan.unchanged", len(stats) - len(todo))
+        logging.info("Scan: %d sticker(s), %d queued", len(stats), len(todo))
+        print(f"🔎  {len(stats)} sticker(s): {len(todo)} new or changed, "
+              f"{len(stats) - len(todo)} unchanged")
+        return todo
+
+    def _restore(self, webp: Path, rec: Dict) -> bool:
+        """Put an unchanged sticker back from its record; False if it lacks output."""
+        if not (webp.parent / "manifest.json").exists():
+            return False
+        entry = rec.get("entry") or self.manifests.get(webp)
+        if entry is None or (self.catalog is not None and slug(webp.stem) not in self.catalog.index):
+            return False
+        self.entries[webp] = entry
+        if rec.get("tags"):
+            self.manifests.tags[webp.stem] = rec["tags"]
+        if rec.get("dhash"):
+            self.phashes[webp.stem] = int(rec["dhash"], 16)
+        return True
+
+    def unchanged(self, webp: Path) -> bool:
+        """Resumed from the journal and untouched since."""
+        st = webp.stat()
+        return self.resumed.get(webp) == (st.st_size, st.st_mtime_ns)
+
+    def _record(self, rel: str) -> Optional[Dict]:
+        """Latest snapshot record of a sticker, pending updates included."""
+        return self.seen[rel] if rel in self.seen else self.snapshot.get(rel)
+
+    def known_dhashes(self, webps: List[Path]) -> Dict[str, int]:
+        """Content hash → dHash of every committed (or pending) sticker not in `webps`."""
+        rels = {rel for rel, _ in self.snapshot.items() if rel != SNAPSHOT_CONFIG} | set(self.seen)
+        skip = {str(w.relative_to(PACKS)) for w in webps}
+        records = (self._record(rel) for rel in rels - skip)
+        return {rec["digest"]: int(rec["dhash"], 16) for rec in records
+                if rec is not None and rec.get("dhash")}
+
+    def known_digests(self, webps: List[Path]) -> Dict[Path, str]:
+        """Content hashes of `webps` whose file still matches its snapshot record."""
+        if self.snapshot is None:
+            return {}
+        out = {}
+        for w in webps:
+            rec = self._record(str(w.relative_to(PACKS)))
+            if rec is not None:
+                st = w.stat()
+                if rec["stat"] == [st.st_size, st.st_mtime_ns]:
+                    out[w] = rec["digest"]
+        return out
+
+    def process(self, webps: List[Path]) -> None:
+        """Run the stages over `webps` (already foldered) and stage the output."""
+        args = self.args
+        if self.resumed:
+            webps = [w for w in webps if not self.unchanged(w)]
+            self.resumed = {}
+        hashes = self.known_digests(webps)
+        if self.optimized is not None:
+            with METRICS.timer("optimize"):
+                self.rewritten |= optimize_sources(
+                    webps, self.optimized, args.jobs, args.source_min_ssim,
+                    args.source_quality, args.source_bpp, self.scores, self.build, hashes)
+        cutouts = None
+        if self.bg is not None and "thumbs" in self.stages:
+            with METRICS.timer("bg"):
+                cutouts = self.bg.cutouts(webps, hashes)
+        share = args.share_cluster_scores and self.snapshot is not None
+        for fixed, decoded, tier in run_stages(webps, args.jobs, self.build, self.scores,
+                                               args.score_ttl, args.rescore_budget,
+                                               args.retry_rounds, self.spec,
+                                               render="thumbs" in self.stages,
+                                               score="score" in self.stages,
+                                               share_radius=args.dup_radius
+                                               if args.share_cluster_scores else None,
+                                               cutouts=cutouts, hashes=hashes,
+                                               known=self.known_dhashes(webps)
+                                               if share else None):
+            if tier is None:               # score stage off and nothing stored
+                prev = self.manifests.get(fixed)
+                tier = prev["viralityTier"] if prev else 1
+            entry, csv_row = build_entry(fixed, decoded, tier)
+            st = fixed.stat()
+            rel = str(fixed.relative_to(PACKS))
+            stat = [st.st_size, st.st_mtime_ns]
+            self.journal.put(rel, {
+                "stat": stat, "entry": entry, "csv": csv_row, "dhash": decoded.dhash,
+                **({"digest": hashes[fixed]} if fixed in hashes else {})})
+            self._stage(fixed, entry, csv_row, decoded.dhash)
+            if fixed in hashes:
+                self.seen[rel] = snapshot_record(stat, hashes[fixed], decoded.dhash, csv_row, entry)
+            METRICS.count("stickers")
+
+    def remove(self, webp: Path) -> None:
+        """Forget a deleted sticker: CSV row, manifest entry, thumbnails."""
+        rel = str(webp.relative_to(PACKS))
+        self.journal.put(rel, {"removed": True})
+        self.seen[rel] = None
+        self._forget(webp)
+
+    def _forget(self, webp: Path) -> None:
+        if self.catalog is not None:
+            self.catalog.remove(slug(webp.stem))
+        self.manifests.remove(webp)
+        for path in thumb_files(webp):
+            path.unlink(missing_ok=True)
+        self.entries.pop(webp, None)
+        self.phashes.pop(webp.stem, None)
+        logging.info("Removed %s", webp.name)
+
+    def sync(self, batch: Set[str]) -> Set[str]:
+        """
+        Apply one debounced batch of changed paths and commit; → paths the
+        session itself moved or re‑encoded, so the watcher can ignore
+        their events.
+        """
+        moved: Set[str] = set()
+        changed: List[Path] = []
+        for raw in sorted(Path(p) for p in batch):
+            if raw.exists():
+                fixed = ensure_foldered(raw)
+                if fixed != raw:
+                    moved |= {str(raw), str(fixed)}
+                changed.append(fixed)
+            elif raw.parent == PACKS and (PACKS / raw.stem / raw.name).exists():
+                continue                       # our own ensure_foldered move
+            elif raw.parent != PACKS:
+                self.remove(raw)
+        changed = sorted(set(changed))
+        logging.info("Watch batch: %d changed, %d event(s)", len(changed), len(batch))
+        self.process(changed)
+        self.commit()
+        moved |= {str(p) for p in self.rewritten}
+        self.rewritten = set()
+        return moved
+
+    def changed(self) -> bool:
+        """Anything staged, removed or re‑snapshotted since the last commit."""
+        return bool(len(self.journal) or self.manifests.dirty or self.seen or self.reset
+                    or not INDEX_PATH.exists()
+                    or (self.args.shards and not SHARD_DIR.exists()))
+
+    def commit(self) -> None:
+        """Flush CSV + manifests if anything changed, then refresh the whole‑tree stages."""
+        if self.changed():
+            self._flush()
+        else:
+            logging.info("Nothing queued or removed: CSV, manifests and indexes untouched")
+        if "dupes" in self.stages:
+            with METRICS.timer("dupes"):
+                report_duplicates(self.phashes, self.args.dup_radius)
+        if self.args.atlas:
+            members = [member_for(e["id"], fixed.parent / e["thumb"])
+                       for fixed, e in self.entries.items()
+                       if (fixed.parent / e["thumb"]).exists()]
+            with METRICS.timer("atlas"):
+                written, total = build_atlas(members, ATLAS_DIR)
+            logging.info("Atlas: %d of %d sheet(s) rebuilt", written, total)
+
+    def _flush(self) -> None:
+        if self.catalog is not None:
+            self.catalog.flush()
+        if "manifest" in self.stages:
+            with METRICS.timer("manifest.commit"):
+                METRICS.count("manifest.written", self.manifests.commit(self.entries))
+            if self.args.shards:
+                write_shards(self.manifests.index, SHARD_DIR,
+                             self.args.shard_count, self.args.shard_bytes)
+        if self.catalog is not None and self.args.shards:
+            write_csv_chunks(self.catalog.header, self.catalog.body, self.catalog.path,
+                             self.args.csv_chunk_bytes)
+        self.journal.clear()                   # everything journaled is on disk now
+        if self.snapshot is not None:
+            if self.reset:                     # taken under other settings
+                self.snapshot.clear()
+                self.reset = False
+            for rel, rec in self.seen.items():
+                if rec is None:
+                    self.snapshot.delete(rel)
+                else:
+                    self.snapshot.put(rel, rec)
+            self.seen = {}
+            if self.snapshot.get(SNAPSHOT_CONFIG) != {"text": self.config}:
+                self.snapshot.put(SNAPSHOT_CONFIG, {"text": self.config})
+
+    def close(self) -> None:
+        if self.catalog is not None:
+            self.catalog.flush()
+        for store in (self.build, self.scores, self.journal, self.optimized, self.snapshot):
+            if store is not None:
+                store.close()
+        if self.bg is not None:
+            self.bg.close()
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Build sticker manifests + Shopify CSV")
+    ap.add_argument("--jobs", "-j", type=int, default=1,
+                    help="worker count for the pipelined mode (1 = serial)")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="ignore the build cache and score store; decode and score everything")
+    ap.add_argument("--score-ttl", type=float, default=SCORE_TTL_DAYS, metavar="DAYS",
+                    help="virality scores older than this are due for refresh")
+    ap.add_argument("--rescore-budget", type=int, default=None, metavar="N",
+                    help="refresh at most N of the stalest expired scores per run")
+    ap.add_argument("--vision-batch", type=int, default=MAX_BATCH_SIZE, metavar="N",
+                    help=f"images per Vision batch request (max {MAX_BATCH_SIZE})")
+    ap.add_argument("--vision-max-bytes", type=int, default=DEFAULT_MAX_BYTES, metavar="B",
+                    help="raw image bytes per Vision batch request")
+    ap.add_argument("--vision-qps", type=float, default=VISION_QPS,
+                    help="sustained Vision images/s (adaptive, halves on 429)")
+    ap.add_argument("--gemini-qps", type=float, default=GEMINI_QPS,
+                    help="sustained Gemini calls/s (adaptive, halves on 429)")
+    ap.add_argument("--retry-rounds", type=int, default=RETRY_ROUNDS,
+                    help="end‑of‑run passes over transiently failed stickers")
+    ap.add_argument("--thumb-format", choices=sorted(THUMB_FORMATS), default="png",
+                    help="thumbnail encoding (AVIF needs Pillow ≥11.2 or pillow‑avif‑plugin)")
+    ap.add_argument("--thumb-quality", type=int, default=80, help="WebP/AVIF quality")
+    ap.add_argument("--png-level", type=int, default=9, choices=range(10), metavar="0-9",
+                    help="PNG zlib level; 9 also enables optimize")
+    ap.add_argument("--thumb-ladder", type=int_list, default=DEFAULT_THUMB.ladder,
+                    metavar="PX,…", help="thumbnail boxes listed under `thumbs` ('' = none)")
+    ap.add_argument("--thumb-densities", type=int_list, default=DEFAULT_THUMB.densities,
+                    metavar="X,…", help="pixel densities rendered for each ladder box")
+    ap.add_argument("--stages", type=stage_list, default=STAGES, metavar="S,…",
+                    help=f"stages to run, from {','.join(STAGES)} (default: all)")
+    ap.add_argument("--dup-radius", type=int, default=DEFAULT_RADIUS, metavar="BITS",
+                    help="max dHash Hamming distance for near‑duplicates")
+    ap.add_argument("--share-cluster-scores", action="store_true",
+                    help="score each near‑duplicate cluster once")
+    ap.add_argument("--atlas", action="store_true",
+                    help="pack thumbnails into sprite sheets after the manifests")
+    ap.add_argument("--anim-max-frames", type=int, default=DEFAULT_THUMB.max_frames,
+                    help="frame cap for animated thumbnails")
+    ap.add_argument("--anim-max-fps", type=float, default=DEFAULT_THUMB.max_fps,
+                    help="frame‑rate cap for animated thumbnails")
+    ap.add_argument("--regenerate-thumbs", action="store_true",
+                    help="rebuild missing, oversized or unreadable thumbnails first")
+    ap.add_argument("--shards", action="store_true",
+                    help="also write paginated, content‑addressed shards + CSV chunks")
+    ap.add_argument("--shard-count", type=int, default=SHARD_COUNT, metavar="N",
+                    help="max entries per shard")
+    ap.add_argument("--shard-bytes", type=int, default=SHARD_BYTES, metavar="B",
+                    help="max JSON bytes per shard")
+    ap.add_argument("--csv-chunk-bytes", type=int, default=SHOPIFY_CSV_LIMIT, metavar="B",
+                    help="max bytes per product_catalog-<n>.csv chunk")
+    ap.add_argument("--remove-bg", action="store_true",
+                    help="render thumbnails from rembg cutouts of stickers without alpha")
+    ap.add_argument("--bg-model", default=DEFAULT_MODEL, help="rembg model name")
+    ap.add_argument("--bg-threads", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                    help="onnxruntime threads for the shared rembg session")
+    ap.add_argument("--bg-workers", type=int, default=2,
+                    help="images in flight against the session")
+    ap.add_argument("--bg-batch", type=int, default=16, metavar="N",
+                    help="images handed to the workers per batch")
+    ap.add_argument("--optimize-sources", action="store_true",
+                    help="re‑encode source WebPs in place when a smaller file keeps the quality")
+    ap.add_argument("--source-min-ssim", type=float, default=MIN_SSIM, metavar="S",
+                    help="perceptual floor (mean block SSIM) for re‑encoded sources")
+    ap.add_argument("--source-quality", type=quality_range, default=QUALITY_RANGE,
+                    metavar="LO,HI", help="WebP quality range searched for sources")
+    ap.add_argument("--source-bpp", type=float, default=0.0, metavar="BITS",
+                    help="leave sources at or under this many bits per pixel alone")
+    ap.add_argument("--full-scan", action="store_true",
+                    help="process every sticker, not just those changed since the scan snapshot")
+    ap.add_argument("--resume", action="store_true",
+                    help="replay the journal of an interrupted run and skip its finished stickers")
+    ap.add_argument("--trace", type=Path, default=None, metavar="FILE",
+                    help="write Chrome trace events (chrome://tracing, Perfetto) to FILE")
+    ap.add_argument("--profile", choices=("cpu", "mem"), default=None,
+                    help="wrap the run in cProfile (main thread, stats → logs/) or tracemalloc")
+    ap.add_argument("--watch", action="store_true",
+                    help="after the build, keep watching for added/changed/deleted stickers")
+    ap.add_argument("--debounce", type=float, default=2.0, metavar="S",
+                    help="--watch: wait for S quiet seconds before processing a burst")
+    ap.add_argument("--poll", action="store_true",
+                    help="--watch: poll instead of inotify (e.g. drvfs mounts under WSL)")
+    return ap.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    vision_batcher.batch_size = max(1, min(args.vision_batch, MAX_BATCH_SIZE))
+    vision_batcher.max_bytes  = args.vision_max_bytes
+    VISION_API.bucket = TokenBucket(args.vision_qps, MAX_BATCH_SIZE)
+    GEMINI_API.bucket = TokenBucket(args.gemini_qps, 1)
+    stages = set(args.stages)
+    if "csv" in stages:
+        init_csv()
+
+    if args.trace is not None:
+        METRICS.start_trace(args.trace)
+    try:
+        with profiled(args.profile, LOGDIR / "sticker_build.pstats"):
+            run_build(args)
+    finally:
+        METRICS.stop_trace()
+
+    METRICS.count("vision.rpcs", vision_batcher.rpcs)
+    logging.info("Vision: %d batch RPC(s)", vision_batcher.rpcs)
+    for api in (VISION_API, GEMINI_API):
+        METRICS.count(f"{api.name}.throttles", api.throttles)
+        METRICS.count(f"{api.name}.deferred", api.deferred)
+        logging.info("%s: %d throttle(s), %d deferral(s)", api.name, api.throttles, api.deferred)
+    summary = METRICS.summary()
+    logging.info("Run summary:\n%s", summary)
+    print(summary)
+    print(f"✅  Stages {','.join(s for s in STAGES if s in stages)} up to date.")
+
+def scan_stickers() -> Dict[Path, Tuple[int, int]]:
+    """
+    One scandir pass for size + mtime; every .webp is foldered up front so
+    both modes see the same, stable list. → foldered source → (size, mtime_ns)
+    """
+    with METRICS.timer("scan"):
+        found = scan_tree(PACKS, is_source_webp)
+    stats: Dict[Path, Tuple[int, int]] = {}
+    for raw in sorted(map(Path, found)):
         fixed = ensure_foldered(raw)
-        pack_manifest = fixed.parent / "manifest.json"
+        stats.setdefault(fixed, found.get(str(fixed), found[str(raw)]))
+    METRICS.count("scan.files", len(stats))
+    return stats
 
-        existing: List[Dict] = []
-        if pack_manifest.exists():
-            existing = json.loads(pack_manifest.read_text())
+def run_build(args: argparse.Namespace) -> None:
+    """Scan, build, commit – then keep syncing with --watch."""
+    # started first so edits made during the initial build are not missed
+    watcher = Watcher(PACKS, is_source_webp, debounce=args.debounce,
+                      poll=args.poll) if args.watch else None
 
-        # keep other entries, drop the one we’ll regenerate
-        existing = [e for e in existing if e["id"] != fixed.stem]
-        existing.append(process_webp(fixed))
-        existing.sort(key=lambda x: x["id"])
+    stats = scan_stickers()
+    webps = list(stats)
 
-        pack_manifest.write_text(json.dumps(existing, indent=2, ensure_ascii=False))
-        logging.info("Updated %s", pack_manifest)
+    spec = ThumbSpec(fmt=args.thumb_format, quality=args.thumb_quality,
+                     png_level=args.png_level, ladder=args.thumb_ladder,
+                     densities=args.thumb_densities, max_frames=args.anim_max_frames,
+                     max_fps=args.anim_max_fps)
+    if args.regenerate_thumbs:
+        regenerate_thumbs(webps, spec, args.jobs)
 
-    print("✅  All manifests and product_catalog.csv up to date.")
+    session = BuildSession(args, spec)
+    try:
+        session.process(session.queue(stats))
+        session.commit()
+        if watcher is not None:
+            print(f"👀  Watching {PACKS} – Ctrl‑C to stop")
+            try:
+                for batch in watcher.batches():
+                    watcher.ignore(session.sync(batch))
+            except KeyboardInterrupt:
+                pass
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        session.close()
 
 if __name__ == "__main__":
     if not PACKS.exists():
-        sys.exit("❌  /mnt/c/icon/packages/stickers/ not found")
+        sys.exit(f"❌  {PACKS}/ not found")
     main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+catalog_binindex.py – compact binary sticker index (packages/stickers/index.bin)
+––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+
+• written next to index.json by the catalog builder; same entries, but
+  lookups mmap the file instead of parsing 16k lines of JSON
+• little‑endian, versioned layout:
+    header   32 B   magic "STKX", version, record size, counts, section offsets
+    records  64 B × n, sorted by the UTF‑8 bytes of `id`
+    offsets  u32 × (strings + 1) – byte offset of each string, plus the end
+    strings  UTF‑8, deduplicated, concatenated
+• `BinIndex.find(id)` bisects the records (O(log n)); iteration hands out
+  `Record` views onto the mapping, decoding a field only when it is read
+• `thumbs` ladders stay JSON‑only; everything else round‑trips
+"""
+
+import mmap, struct, sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+MAGIC = b"STKX"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIIIII")   # magic ver recsize count nstr rec_off off_off str_off str_size
+RECORD = struct.Struct("<6I3d3I2B2x")   # id name file thumb w h | x y price | frames ms bytes | tier flags
+OFFSET = struct.Struct("<I")
+ANIMATED = 1
+
+def encode_index(entries: List[Dict]) -> bytes:
+    """Serialise index.json‑style entries; identical input → identical bytes."""
+    rows = sorted(entries, key=lambda e: e["id"].encode("utf-8"))
+    strings: Dict[str, int] = {}
+
+    def ref(s: str) -> int:
+        return strings.setdefault(s, len(strings))
+
+    records = bytearray()
+    for e in rows:
+        pos = e.get("defaultPosition") or {}
+        records += RECORD.pack(
+            ref(e["id"]), ref(e["name"]), ref(e["file"]), ref(e["thumb"]),
+            e["width"], e["height"],
+            pos.get("x", 0.5), pos.get("y", 0.5), e["priceUSD"],
+            e.get("frames", 0), e.get("durationMs", 0), e.get("bytes", 0),
+            e["viralityTier"], ANIMATED if e["animated"] else 0)
+
+    blob = bytearray()
+    offsets = bytearray()
+    for s in strings:                      # dicts keep insertion order
+        offsets += OFFSET.pack(len(blob))
+        blob += s.encode("utf-8")
+    offsets += OFFSET.pack(len(blob))
+
+    rec_off = HEADER.size
+    off_off = rec_off + len(records)
+    str_off = off_off + len(offsets)
+    header = HEADER.pack(MAGIC, VERSION, RECORD.size, len(rows), len(strings),
+                         rec_off, off_off, str_off, len(blob))
+    return bytes(header + records + offsets + blob)
+
+class Record:
+    """One sticker, read lazily from the mapped file."""
+
+    __slots__ = ("index", "pos")
+
+    def __init__(self, index: "BinIndex", pos: int):
+        self.index = index
+        self.pos = pos
+
+    def _fields(self) -> tuple:
+        return RECORD.unpack_from(self.index.view, self.index.rec_off + self.pos * RECORD.size)
+
+    def raw_id(self) -> memoryview:
+        """The id's UTF‑8 bytes, without copying."""
+        sid, = struct.unpack_from("<I", self.index.view, self.index.rec_off + self.pos * RECORD.size)
+        return self.index.raw_string(sid)
+
+    @property
+    def id(self) -> str:
+        return str(self.raw_id(), "utf-8")
+
+    def to_dict(self) -> Dict:
+        """The index.json entry (minus `thumbs`)."""
+        (sid, name, file, thumb, w, h, x, y, price,
+         frames, ms, size, tier, flags) = self._fields()
+        s = self.index.string
+        entry = {
+            "id": s(sid), "name": s(name), "file": s(file),
+            "width": w, "height": h, "animated": bool(flags & ANIMATED),
+            "defaultPosition": {"x": x, "y": y},
+            "thumb": s(thumb),
+            "viralityTier": tier, "priceUSD": price,
+        }
+        if flags & ANIMATED:
+            entry.update(frames=frames, durationMs=ms, bytes=size)
+        return entry
+
+    def __repr__(self) -> str:
+        return f"Record({self.id!r})"
+
+class BinIndex:
+    """Read‑only, memory‑mapped view of an index.bin file."""
+
+    def __init__(self, path: Path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self._map)
+        (magic, version, rec_size, self.count, self.nstrings,
+         self.rec_off, self.off_off, self.str_off, str_size) = HEADER.unpack_from(self.view)
+        if magic != MAGIC or version != VERSION or rec_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path}: not a v{VERSION} sticker index")
+        if self.str_off + str_size > len(self.view):
+            self.close()
+            raise ValueError(f"{path}: truncated")
+
+    def raw_string(self, i: int) -> memoryview:
+        start, end = struct.unpack_from("<II", self.view, self.off_off + i * OFFSET.size)
+        return self.view[self.str_off + start:self.str_off + end]
+
+    def string(self, i: int) -> str:
+        return str(self.raw_string(i), "utf-8")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, pos: int) -> Record:
+        if not 0 <= pos < self.count:
+            raise IndexError(pos)
+        return Record(self, pos)
+
+    def __iter__(self) -> Iterator[Record]:
+        for pos in range(self.count):
+            yield Record(self, pos)
+
+    def find(self, sticker_id: str) -> Optional[Record]:
+        """Binary search by id; → the record or None."""
+        key = sticker_id.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if Record(self, mid).raw_id().tobytes() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and Record(self, lo).raw_id() == key:
+            return Record(self, lo)
+        return None
+
+    def __contains__(self, sticker_id: str) -> bool:
+        return self.find(sticker_id) is not None
+
+    def close(self) -> None:
+        self.view.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "BinIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+if __name__ == "__main__":
+    import json
+    if len(sys.argv) < 3:
+        sys.exit("usage: catalog_binindex.py index.bin ID …")
+    with BinIndex(Path(sys.argv[1])) as idx:
+        for sid in sys.argv[2:]:
+            rec = idx.find(sid)
+            print(json.dumps(rec.to_dict() if rec else None, ensure_ascii=False))
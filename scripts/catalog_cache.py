@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+catalog_cache.py – tiny persistent key/value stores for the sticker builder
+––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+
+• JSON‑lines on disk: one {"key": …, "value": …} record per line
+• appends are flushed immediately, so a killed run keeps finished work
+• values come back with their keys in insertion order (the journal
+  replays manifest entries verbatim)
+• last record for a key wins (a null value is a tombstone);
+  `compact()` rewrites the file atomically
+"""
+
+import hashlib, json, os
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+def file_digest(path: Path, chunk: int = 1 << 20) -> str:
+    """sha256 of a file's bytes (hex)."""
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    """Write via a sibling temp file + rename so readers never see half a file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with tmp.open("wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def atomic_write_text(path: Path, text: str) -> None:
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+class JsonlStore:
+    """Append‑only JSON‑lines map, loaded fully into memory on open."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.data: Dict[str, Dict] = {}
+        self._dirty = 0
+        if path.exists():
+            with path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        if rec["value"] is None:    # tombstone
+                            self.data.pop(rec["key"], None)
+                        else:
+                            self.data[rec["key"]] = rec["value"]
+                    except (ValueError, KeyError, TypeError):
+                        continue            # torn tail from a crash – skip
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = path.open("a", encoding="utf-8")
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.data
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        return iter(self.data.items())
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self.data.get(key)
+
+    def _append(self, key: str, value: Optional[Dict]) -> None:
+        self._fh.write(json.dumps({"key": key, "value": value},
+                                  ensure_ascii=False) + "\n")
+        self._fh.flush()
+        self._dirty += 1
+
+    def put(self, key: str, value: Dict) -> None:
+        self.data[key] = value
+        self._append(key, value)
+
+    def delete(self, key: str) -> None:
+        if self.data.pop(key, None) is not None:
+            self._append(key, None)
+
+    def compact(self) -> None:
+        """Drop superseded lines; no‑op when nothing changed since open."""
+        if not self._dirty:
+            return
+        self._fh.close()
+        atomic_write_text(self.path, "".join(
+            json.dumps({"key": k, "value": v}, ensure_ascii=False) + "\n"
+            for k, v in self.data.items()))
+        self._fh = self.path.open("a", encoding="utf-8")
+        self._dirty = 0
+
+    def clear(self) -> None:
+        """Forget every key, on disk too."""
+        self._fh.close()
+        self.data = {}
+        atomic_write_text(self.path, "")
+        self._fh = self.path.open("a", encoding="utf-8")
+        self._dirty = 0
+
+    def close(self) -> None:
+        self.compact()
+        self._fh.close()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+catalog_metrics.py – timers, counters and tracing for the sticker builder
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+
+• `METRICS.timer("vision")` / `METRICS.count("cache.build.hit")` from any
+  thread; pool *processes* hand theirs back through `measured()`
+• `summary()` renders the end‑of‑run table (count, total, mean, max)
+• `start_trace(path)` streams Chrome trace events, one per line, in the
+  JSON array format chrome://tracing and Perfetto accept unterminated
+• `profiled("cpu" | "mem", out)` wraps a run in cProfile or tracemalloc
+"""
+
+import contextlib, cProfile, io, json, os, pstats, threading, time, tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, TypeVar
+
+T = TypeVar("T")
+
+class Metrics:
+    """Thread‑safe timers ([count, total s, max s]) and counters."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timers: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.events: List[Dict] = []           # buffered in pool workers
+        self.trace: Optional[TextIO] = None
+        self.owner = os.getpid()
+        self.tracing = False
+
+    def _before_fork(self) -> None:
+        """Hold the lock and flush the trace, so children inherit no buffered events."""
+        self.lock.acquire()
+        if self.trace is not None:
+            self.trace.flush()
+
+    def _after_fork(self) -> None:
+        self.lock.release()
+
+    def _forked(self) -> None:
+        """Pool workers start empty instead of re‑reporting the parent's totals."""
+        self.lock = threading.Lock()
+        self.timers, self.counters, self.events = {}, {}, []
+        self.trace = None
+
+    def _add(self, name: str, count: float, total: float, peak: float) -> None:
+        rec = self.timers.setdefault(name, [0, 0.0, 0.0])
+        rec[0] += count
+        rec[1] += total
+        rec[2] = max(rec[2], peak)
+
+    def _emit(self, event: Dict) -> None:
+        """Caller holds the lock."""
+        if self.trace is not None and os.getpid() == self.owner:
+            self.trace.write(json.dumps(event) + ",\n")
+        else:
+            self.events.append(event)
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **args) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            dt = time.monotonic() - start
+            with self.lock:
+                self._add(name, 1, dt, dt)
+                if self.tracing:
+                    self._emit({"name": name, "cat": name.split(".")[0], "ph": "X",
+                                "ts": int(start * 1e6), "dur": int(dt * 1e6),
+                                "pid": os.getpid(), "tid": threading.get_native_id(),
+                                "args": args})
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def drain(self) -> Dict:
+        """Take (and reset) everything gathered so far – pool worker side."""
+        with self.lock:
+            snap = {"timers": self.timers, "counters": self.counters, "events": self.events}
+            self.timers, self.counters, self.events = {}, {}, []
+        return snap
+
+    def merge(self, snap: Dict) -> None:
+        with self.lock:
+            for name, (count, total, peak) in snap["timers"].items():
+                self._add(name, count, total, peak)
+            for name, n in snap["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            for event in snap["events"]:
+                self._emit(event)
+
+    def start_trace(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.trace = path.open("w", encoding="utf-8")
+        self.trace.write("[\n")
+        self.owner = os.getpid()
+        self.tracing = True
+
+    def stop_trace(self) -> None:
+        with self.lock:
+            if self.trace is not None:
+                self.trace.close()
+                self.trace = None
+            self.tracing = False
+
+    def summary(self) -> str:
+        with self.lock:
+            timers = sorted(self.timers.items(), key=lambda kv: -kv[1][1])
+            counters = sorted(self.counters.items())
+        lines = [f"{'stage':<20} {'count':>8} {'total s':>9} {'mean ms':>9} {'max ms':>9}"]
+        for name, (count, total, peak) in timers:
+            mean = total / count * 1e3 if count else 0.0
+            lines.append(f"{name:<20} {int(count):>8} {total:>9.2f} {mean:>9.1f} {peak * 1e3:>9.1f}")
+        for name, n in counters:
+            lines.append(f"{name:<20} {n:>8}")
+        return "\n".join(lines)
+
+METRICS = Metrics()
+os.register_at_fork(before=METRICS._before_fork, after_in_parent=METRICS._after_fork,
+                   after_in_child=METRICS._forked)
+
+def measured(fn: Callable[..., T], *args, **kwargs):
+    """Run `fn` in a pool worker; → (result, metrics gathered there)."""
+    result = fn(*args, **kwargs)
+    return result, METRICS.drain()
+
+@contextlib.contextmanager
+def profiled(mode: Optional[str], out: Path, top: int = 25) -> Iterator[None]:
+    """
+    "cpu": cProfile the calling thread, dump stats to `out`, print the top
+    functions; "mem": tracemalloc, print the top allocation sites and peak.
+    """
+    if mode is None:
+        yield
+        return
+    if mode == "cpu":
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            prof.dump_stats(str(out))
+            buf = io.StringIO()
+            pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+            print(buf.getvalue())
+            print(f"📈  cProfile stats → {out}")
+        return
+    tracemalloc.start(10)
+    try:
+        yield
+    finally:
+        snap = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        for stat in snap.statistics("lineno")[:top]:
+            print(stat)
+        print(f"📈  traced memory: {current / 2**20:.1f} MiB now, {peak / 2**20:.1f} MiB peak")
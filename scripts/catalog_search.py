@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+catalog_search.py – prebuilt sticker search index (packages/stickers/search.json)
+––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+
+• ids, names and CSV tags are split into lower‑case tokens
+  ("DistractedBoyfriend_v2" → distracted, boyfriend, v2)
+• inverted index: sorted token list with parallel posting lists, an
+  edge n‑gram table mapping every prefix (≤ MAX_PREFIX chars) to its
+  token range, and a trigram table over tokens for fuzzy matching
+• `SearchIndex.search()` – every query word must match; the last word
+  may be a prefix, any word may be misspelt by an edit or two;
+  `prefix()` is the same without typo tolerance (typeahead)
+• multi‑word queries walk score tiers best first and intersect postings
+  per tier combination, stopping once `limit` ids are found
+"""
+
+import bisect, heapq, itertools, json, re, sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+SEARCH_VERSION = 1
+MAX_PREFIX = 4                          # longer prefixes bisect the token list
+WORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+def tokenize(text: str) -> List[str]:
+    """camelCase / snake_case / kebab-case words, lower‑cased, in order."""
+    return [w.lower() for w in WORD.findall(text)]
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"^{token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def build_search_index(entries: Iterable[Dict], tags: Optional[Dict[str, Sequence[str]]] = None) -> Dict:
+    """index.json‑style entries (+ tags by id) → the search.json document."""
+    tags = tags or {}
+    # doc number doubles as the tie‑break rank: shorter ids first
+    docs = sorted(entries, key=lambda e: (len(e["id"]), e["id"]))
+    postings: Dict[str, Set[int]] = {}
+    for n, e in enumerate(docs):
+        words = tokenize(e["id"]) + tokenize(e["name"])
+        for tag in tags.get(e["id"], ()):
+            words += tokenize(tag)
+        for w in words:
+            postings.setdefault(w, set()).add(n)
+
+    tokens = sorted(postings)
+    prefixes: Dict[str, List[int]] = {}
+    for i, tok in enumerate(tokens):
+        for k in range(1, min(len(tok), MAX_PREFIX) + 1):
+            prefixes.setdefault(tok[:k], [i, i])[1] = i + 1
+    grams: Dict[str, List[int]] = {}
+    for i, tok in enumerate(tokens):
+        for g in sorted(trigrams(tok)):
+            grams.setdefault(g, []).append(i)
+    return {
+        "version": SEARCH_VERSION,
+        "docs": [e["id"] for e in docs],
+        "names": [e["name"] for e in docs],
+        "tokens": tokens,
+        "postings": [sorted(postings[t]) for t in tokens],
+        "prefixes": prefixes,
+        "trigrams": grams,
+    }
+
+def dump_search_index(index: Dict) -> str:
+    return json.dumps(index, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, giving up (→ limit + 1) once it exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+def max_edits(word: str) -> int:
+    return 0 if len(word) <= 3 else 1 if len(word) <= 6 else 2
+
+class SearchIndex:
+    """Query side of search.json; load once, then query many times."""
+
+    def __init__(self, index: Dict):
+        if index.get("version") != SEARCH_VERSION:
+            raise ValueError(f"not a v{SEARCH_VERSION} search index")
+        self.docs: List[str] = index["docs"]
+        self.names: List[str] = index["names"]
+        self.tokens: List[str] = index["tokens"]
+        self.postings: List[List[int]] = index["postings"]
+        self.prefixes: Dict[str, List[int]] = index["prefixes"]
+        self.grams: Dict[str, List[int]] = index["trigrams"]
+
+    @classmethod
+    def load(cls, path: Path) -> "SearchIndex":
+        return cls(json.loads(path.read_text(encoding="utf-8")))
+
+    def token_range(self, prefix: str) -> Tuple[int, int]:
+        """[lo, hi) of the tokens starting with `prefix`."""
+        if len(prefix) <= MAX_PREFIX:
+            lo, hi = self.prefixes.get(prefix, (0, 0))
+            return lo, hi
+        lo = bisect.bisect_left(self.tokens, prefix)
+        hi = bisect.bisect_left(self.tokens, prefix + "\U0010ffff", lo)
+        return lo, hi
+
+    def fuzzy_tokens(self, word: str) -> List[Tuple[int, int]]:
+        """(token, distance) for tokens within `max_edits(word)` of `word`."""
+        k = max_edits(word)
+        if not k:
+            return []
+        qgrams = trigrams(word)
+        shared: Dict[int, int] = {}
+        for g in qgrams:
+            for t in self.grams.get(g, ()):
+                shared[t] = shared.get(t, 0) + 1
+        # each edit destroys at most three trigrams
+        need = max(1, len(qgrams) - 3 * k)
+        out = []
+        for t, n in shared.items():
+            if n >= need:
+                d = edit_distance(word, self.tokens[t], k)
+                if d <= k:
+                    out.append((t, d))
+        return out
+
+    def word_tokens(self, word: str, prefix: bool, fuzzy: bool) -> Dict[int, float]:
+        """token → score for one query word (exact 3, prefix 2, fuzzy ≤ 1)."""
+        out: Dict[int, float] = {}
+        if fuzzy:
+            for t, d in self.fuzzy_tokens(word):
+                out[t] = 1.0 / (1 + d)
+        if prefix:
+            lo, hi = self.token_range(word)
+            out.update(dict.fromkeys(range(lo, hi), 2.0))
+        i = bisect.bisect_left(self.tokens, word)
+        if i < len(self.tokens) and self.tokens[i] == word:
+            out[i] = 3.0
+        return out
+
+    def query(self, query: str, limit: int = 20, prefix: bool = True,
+              fuzzy: bool = True) -> List[str]:
+        """
+        Sticker ids matching every word of `query`, best first: summed word
+        scores, then shorter id. Only the last word is treated as a prefix.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        maps = [self.word_tokens(w, prefix and n == len(words) - 1, fuzzy)
+                for n, w in enumerate(words)]
+        if len(maps) == 1:
+            return [self.docs[d] for d in self._top_single(maps[0], limit)]
+        return [self.docs[d] for d in self._top_multi(maps, limit)]
+
+    def _top_single(self, tmap: Dict[int, float], limit: int) -> List[int]:
+        """
+        One word: walk score tiers high → low, merging the (rank‑ordered)
+        postings of each tier lazily, so a broad prefix stops at `limit`.
+        """
+        tiers: Dict[float, List[int]] = {}
+        for t, sc in tmap.items():
+            tiers.setdefault(sc, []).append(t)
+        out: List[int] = []
+        seen: Set[int] = set()
+        for sc in sorted(tiers, reverse=True):
+            for d in heapq.merge(*(self.postings[t] for t in tiers[sc])):
+                if d not in seen:
+                    seen.add(d)
+                    out.append(d)
+                    if len(out) == limit:
+                        return out
+        return out
+
+    def _top_multi(self, maps: List[Dict[int, float]], limit: int) -> List[int]:
+        """
+        Several words: every combination of per‑word score tiers, grouped
+        by total and walked high → low. A combination's docs are the
+        intersection of its tiers' postings – the smallest tier as a set,
+        probed with each other tier's lists – and the walk stops as soon
+        as `limit` docs are found, so the forward index isn't needed.
+        """
+        tiers = []
+        for m in maps:
+            by_score: Dict[float, List[int]] = {}
+            for t, sc in m.items():
+                by_score.setdefault(sc, []).append(t)
+            tiers.append(sorted(by_score.items(), reverse=True))
+        groups: Dict[float, List[Tuple[Tuple[float, List[int]], ...]]] = {}
+        for combo in itertools.product(*tiers):
+            groups.setdefault(round(sum(sc for sc, _ in combo), 6), []).append(combo)
+
+        size = lambda toks: sum(len(self.postings[t]) for t in toks)
+        out: List[int] = []
+        seen: Set[int] = set()          # found at a higher total already
+        for total in sorted(groups, reverse=True):
+            found: Set[int] = set()
+            for combo in groups[total]:
+                lead, *rest = sorted((toks for _, toks in combo), key=size)
+                hits = set().union(*(self.postings[t] for t in lead))
+                for toks in rest:       # C‑level probes of each posting list
+                    if not hits:
+                        break
+                    hits = set().union(*(hits.intersection(self.postings[t]) for t in toks))
+                found |= hits
+            found -= seen
+            out += heapq.nsmallest(limit - len(out), found)
+            if len(out) == limit:
+                break
+            seen |= found
+        return out
+
+    def search(self, query: str, limit: int = 20) -> List[str]:
+        """Prefix + typo‑tolerant search, for the library search box."""
+        return self.query(query, limit)
+
+    def prefix(self, query: str, limit: int = 20) -> List[str]:
+        """Typeahead: like `search`, without typo tolerance."""
+        return self.query(query, limit, fuzzy=False)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("usage: catalog_search.py search.json QUERY …")
+    idx = SearchIndex.load(Path(sys.argv[1]))
+    for hit in idx.search(" ".join(sys.argv[2:])):
+        print(hit)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+catalog_shards.py – paginated, content‑addressed catalog output (--shards)
+––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+
+• index entries, in index.json order, are cut into pages of at most
+  `max_count` entries / `max_bytes` of JSON and written as
+  shards/<sha256[:16]>.json – a shard's name changes iff its bytes do,
+  so clients may cache shards forever
+• shards/shards.json lists the pages in order with hash, size, count and
+  first/last id; it is the only file a client has to revalidate
+• the Shopify CSV is cut into product_catalog-<n>.csv chunks below the
+  import size limit; a product's rows (variants) never straddle two chunks
+"""
+
+import csv, hashlib, io, json, logging
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+from catalog_cache import atomic_write_bytes, atomic_write_text
+
+SHARDS_VERSION = 1
+SHARD_COUNT = 500
+SHARD_BYTES = 256 << 10
+SHOPIFY_CSV_LIMIT = 15_000_000          # Shopify product import: 15 MB per file
+
+def encode_entry(entry: Dict) -> bytes:
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def paginate(entries: Sequence[Dict], max_count: int = SHARD_COUNT,
+             max_bytes: int = SHARD_BYTES) -> List[List[bytes]]:
+    """Encoded entries in order, cut by count and by JSON byte size."""
+    pages: List[List[bytes]] = []
+    cur: List[bytes] = []
+    size = 2                                   # "[" + "]"
+    for entry in entries:
+        blob = encode_entry(entry)
+        if cur and (len(cur) >= max_count or size + len(blob) + 1 > max_bytes):
+            pages.append(cur)
+            cur, size = [], 2
+        cur.append(blob)
+        size += len(blob) + 1                  # "," separator
+    if cur:
+        pages.append(cur)
+    return pages
+
+def write_shards(entries: Sequence[Dict], out_dir: Path, max_count: int = SHARD_COUNT,
+                 max_bytes: int = SHARD_BYTES) -> Dict:
+    """Write new shards + shards.json, drop unreferenced ones; → the manifest."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {"version": SHARDS_VERSION, "count": len(entries), "shards": []}
+    keep = {"shards.json"}
+    written = 0
+    pos = 0
+    for page in paginate(entries, max_count, max_bytes):
+        data = b"[" + b",".join(page) + b"]"
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        name = f"{digest}.json"
+        keep.add(name)
+        if not (out_dir / name).exists():      # same name ⇒ same bytes
+            atomic_write_bytes(out_dir / name, data)
+            written += 1
+        manifest["shards"].append({
+            "file": name, "hash": digest, "bytes": len(data), "count": len(page),
+            "first": entries[pos]["id"], "last": entries[pos + len(page) - 1]["id"]})
+        pos += len(page)
+    for stale in out_dir.glob("*.json"):
+        if stale.name not in keep:
+            stale.unlink()
+    text = json.dumps(manifest, indent=2, ensure_ascii=False)
+    path = out_dir / "shards.json"
+    if not path.exists() or path.read_text(encoding="utf-8") != text:
+        atomic_write_text(path, text)
+    logging.info("Shards: %d of %d written", written, len(manifest["shards"]))
+    return manifest
+
+def csv_text(rows: Sequence[Sequence[str]]) -> str:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue()
+
+def write_csv_chunks(header: List[str], body: Sequence[List[str]], base: Path,
+                     max_bytes: int = SHOPIFY_CSV_LIMIT) -> List[Path]:
+    """
+    base-1.csv, base-2.csv, … each with the header and below `max_bytes`.
+    Rows with an empty handle continue the product above and stay with it.
+    """
+    head = len(csv_text([header]).encode("utf-8"))
+    products: List[List[List[str]]] = []
+    for row in body:
+        if not row:
+            continue
+        if products and (not row[0] or row[0] == products[-1][0][0]):
+            products[-1].append(row)
+        else:
+            products.append([row])
+
+    chunks: List[List[List[str]]] = []
+    cur: List[List[str]] = []
+    size = head
+    for rows in products:
+        n = len(csv_text(rows).encode("utf-8"))
+        if cur and size + n > max_bytes:
+            chunks.append(cur)
+            cur, size = [], head
+        cur.extend(rows)
+        size += n
+    if cur or not chunks:
+        chunks.append(cur)
+
+    paths = []
+    for i, rows in enumerate(chunks, 1):
+        path = base.with_name(f"{base.stem}-{i}{base.suffix}")
+        data = csv_text([header] + rows).encode("utf-8")
+        if not path.exists() or path.read_bytes() != data:
+            atomic_write_bytes(path, data)
+        paths.append(path)
+    # chunks beyond the new count are left over from a bigger catalog
+    i = len(chunks) + 1
+    while (stale := base.with_name(f"{base.stem}-{i}{base.suffix}")).exists():
+        stale.unlink()
+        i += 1
+    logging.info("CSV: %d chunk(s) under %d bytes", len(paths), max_bytes)
+    return paths
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+catalog_watch.py – file‑system watching for `build_sticker_catalog.py --watch`
+––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+
+• inotify via the optional `watchdog` package when it is installed
+• otherwise (or with `poll=True`, e.g. on a /mnt/c drvfs mount where
+  inotify never fires for Windows‑side writes) a stat‑snapshot poller
+• both feed one debounced queue: `Watcher.batches()` yields the set of
+  changed sticker paths once the tree has been quiet for `debounce` s;
+  a sticker folder deleted or moved away counts as its sticker gone,
+  one moved in as the stickers now inside it
+• `scan_tree()` – one os.scandir walk with size + mtime per file – is also
+  the builder's initial scan, diffed against its saved snapshot
+"""
+
+import logging, os, threading, time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Set, Tuple
+
+Snapshot = Dict[str, Tuple[int, int]]           # path → (size, mtime_ns)
+
+def scan_tree(root: Path, accept: Callable[[str], bool]) -> Snapshot:
+    """One os.scandir walk collecting size + mtime of every accepted file."""
+    out: Snapshot = {}
+    stack = [str(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for e in it:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        stack.append(e.path)
+                    elif accept(e.name):
+                        st = e.stat(follow_symlinks=False)
+                        out[e.path] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    continue            # vanished mid‑scan
+    return out
+
+def event_paths(event, accept: Callable[[str], bool]) -> Set[str]:
+    """Sticker paths touched by one watchdog event (directory events included)."""
+    src, dest = event.src_path, getattr(event, "dest_path", "")
+    if not event.is_directory:
+        paths = {p for p in (src, dest) if p}
+    elif event.event_type in ("deleted", "moved"):
+        paths = {os.path.join(src, os.path.basename(src) + ".webp")}
+        if dest:
+            paths |= set(scan_tree(Path(dest), accept))
+    else:
+        return set()                    # created/modified dirs: their files report
+    return {p for p in paths if accept(os.path.basename(p))}
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> Set[str]:
+    """Paths added, removed or changed between two snapshots."""
+    return {p for p in old.keys() | new.keys() if old.get(p) != new.get(p)}
+
+class Watcher:
+    """Collects changed paths under `root` and hands them out in debounced batches."""
+
+    def __init__(self, root: Path, accept: Callable[[str], bool],
+                 debounce: float = 2.0, interval: float = 2.0, poll: bool = False):
+        self.root = root
+        self.accept = accept
+        self.debounce = debounce
+        self.interval = interval
+        self.changed: Set[str] = set()
+        self.last_event = 0.0
+        self.cond = threading.Condition()
+        self.observer = None if poll else self._start_inotify()
+        self.snapshot: Snapshot = {} if self.observer else scan_tree(root, accept)
+        logging.info("Watching %s (%s)", root, "inotify" if self.observer else "polling")
+
+    def _start_inotify(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            return None
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = event_paths(event, watcher.accept)
+                if paths:
+                    watcher._note(paths)
+
+        observer = Observer()
+        observer.schedule(Handler(), str(self.root), recursive=True)
+        observer.daemon = True
+        observer.start()
+        return observer
+
+    def _note(self, paths: Set[str]) -> None:
+        with self.cond:
+            self.changed |= paths
+            self.last_event = time.monotonic()
+            self.cond.notify_all()
+
+    def _poll(self) -> None:
+        snap = scan_tree(self.root, self.accept)
+        changed = diff_snapshots(self.snapshot, snap)
+        self.snapshot = snap
+        if changed:
+            self._note(changed)
+
+    def ignore(self, paths: Set[str]) -> None:
+        """Forget events for paths the builder itself just wrote or moved."""
+        with self.cond:
+            self.changed -= paths
+        if self.observer is None:
+            for p in paths:
+                try:
+                    st = os.stat(p)
+                    self.snapshot[p] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    self.snapshot.pop(p, None)
+
+    def batches(self) -> Iterator[Set[str]]:
+        """Block until a burst of changes has settled, then yield it."""
+        while True:
+            if self.observer is None:
+                time.sleep(self.interval)
+                self._poll()
+            with self.cond:
+                if self.observer is not None:
+                    while not self._settled():
+                        quiet = time.monotonic() - self.last_event
+                        # short timeouts keep Ctrl‑C responsive
+                        self.cond.wait(max(0.05, self.debounce - quiet) if self.changed else 1.0)
+                elif not self._settled():
+                    continue
+                batch, self.changed = self.changed, set()
+            yield batch
+
+    def _settled(self) -> bool:
+        return bool(self.changed) and time.monotonic() - self.last_event >= self.debounce
+
+    def stop(self) -> None:
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join(timeout=5)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+phash.py – perceptual hashing + near‑duplicate clustering for stickers
+––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+
+• 64‑bit dHash (gradient sign of a 9×8 grey thumbnail, alpha flattened
+  onto white) – robust to re‑encoding, resizing and small edits
+• multi‑index hash table over Hamming distance: neighbour queries only
+  look at keys sharing an exact chunk, never at every pair
+• `clusters()` unions all pairs within a radius into duplicate groups
+"""
+
+from typing import Dict, Hashable, List, Tuple, TypeVar
+
+from PIL import Image
+
+K = TypeVar("K", bound=Hashable)
+
+HASH_BITS = 64
+DEFAULT_RADIUS = 6              # ≤ 6 of 64 bits differ → "near‑identical"
+
+def dhash(im: Image.Image, size: int = 8) -> int:
+    """Difference hash of `im` (first frame for animations)."""
+    small = im.convert("RGBA")
+    small.thumbnail((size * 8, size * 8), Image.BILINEAR)
+    flat = Image.new("RGBA", small.size, (255, 255, 255, 255))
+    flat.alpha_composite(small)
+    grey = flat.convert("L").resize((size + 1, size), Image.LANCZOS).tobytes()
+    bits = 0
+    for row in range(size):
+        line = grey[row * (size + 1):(row + 1) * (size + 1)]
+        for col in range(size):
+            bits = (bits << 1) | (line[col] < line[col + 1])
+    return bits
+
+def to_hex(h: int) -> str:
+    return f"{h:0{HASH_BITS // 4}x}"
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+class MultiIndex:
+    """
+    Multi‑index hash table for Hamming range queries. The hash is split
+    into radius + 1 disjoint chunks; by pigeonhole any hash within
+    `radius` matches at least one chunk exactly, so a query only checks
+    the keys sharing a chunk with it instead of the whole set.
+    """
+
+    def __init__(self, radius: int = DEFAULT_RADIUS, bits: int = HASH_BITS):
+        self.radius = radius
+        m = radius + 1
+        edges = [bits * i // m for i in range(m + 1)]
+        self.chunks = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(edges, edges[1:])]
+        self.tables: List[Dict[int, List[K]]] = [{} for _ in self.chunks]
+        self.hashes: Dict[K, int] = {}
+
+    def add(self, key: K, h: int) -> None:
+        self.hashes[key] = h
+        for table, (lo, mask) in zip(self.tables, self.chunks):
+            table.setdefault((h >> lo) & mask, []).append(key)
+
+    def search(self, h: int) -> List[Tuple[K, int]]:
+        """All (key, distance) within `radius` of `h`."""
+        seen = set()
+        out: List[Tuple[K, int]] = []
+        for table, (lo, mask) in zip(self.tables, self.chunks):
+            for key in table.get((h >> lo) & mask, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                d = hamming(h, self.hashes[key])
+                if d <= self.radius:
+                    out.append((key, d))
+        return out
+
+def clusters(hashes: Dict[K, int], radius: int = DEFAULT_RADIUS) -> List[List[K]]:
+    """
+    Groups of keys whose hashes are transitively within `radius`; only
+    groups of two or more, each sorted, largest first.
+    """
+    parent: Dict[K, K] = {k: k for k in hashes}
+
+    def find(k: K) -> K:
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    index: MultiIndex = MultiIndex(radius)
+    for key, h in hashes.items():
+        for other, _ in index.search(h):
+            ra, rb = find(key), find(other)
+            if ra != rb:
+                parent[ra] = rb
+        index.add(key, h)
+
+    groups: Dict[K, List[K]] = {}
+    for key in hashes:
+        groups.setdefault(find(key), []).append(key)
+    return sorted((sorted(g) for g in groups.values() if len(g) > 1),
+                  key=lambda g: (-len(g), g[0]))
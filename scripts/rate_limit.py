@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+rate_limit.py – shared rate limiting + retry for the sticker scorers
+––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+
+• one `Backend` per API (Vision, Gemini): token bucket + concurrency cap
+• adaptive: the refill rate halves on every throttle (429 /
+  RESOURCE_EXHAUSTED) and creeps back towards the configured rate on success
+• exponential backoff with full jitter between attempts; when attempts
+  run out the call raises `Deferred`, so the caller can queue the work
+  for the end of the run instead of inventing a score
+"""
+
+import random, threading, time
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# gRPC status codes / HTTP statuses that mean "try again later"
+THROTTLE_CODES  = {8, 429}                 # RESOURCE_EXHAUSTED, Too Many Requests
+TRANSIENT_CODES = THROTTLE_CODES | {4, 14, 503, 504}   # + DEADLINE_EXCEEDED, UNAVAILABLE
+TRANSIENT_NAMES = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable",
+                   "DeadlineExceeded", "GatewayTimeout", "InternalServerError"}
+
+class Deferred(Exception):
+    """A transient failure survived every retry; try again later."""
+
+def _code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "code", None)
+    if callable(code):                     # grpc.RpcError.code()
+        try:
+            code = code()
+        except Exception:
+            return None
+    code = getattr(code, "value", code)    # grpc.StatusCode → (int, str)
+    if isinstance(code, tuple):
+        code = code[0]
+    return code if isinstance(code, int) else None
+
+def is_throttle(exc: BaseException) -> bool:
+    return _code(exc) in THROTTLE_CODES or "RESOURCE_EXHAUSTED" in str(exc) \
+        or type(exc).__name__ in {"ResourceExhausted", "TooManyRequests"}
+
+def is_transient(exc: BaseException) -> bool:
+    return isinstance(exc, (TimeoutError, ConnectionError, Deferred)) or is_throttle(exc) \
+        or _code(exc) in TRANSIENT_CODES or type(exc).__name__ in TRANSIENT_NAMES
+
+class TokenBucket:
+    """Thread‑safe token bucket whose refill rate can be adjusted live."""
+
+    def __init__(self, rate: float, burst: float):
+        self.max_rate = rate
+        self.min_rate = rate / 32
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def acquire(self, n: float = 1.0) -> None:
+        """Block until `n` tokens are available; costs above `burst` go into debt."""
+        need = min(n, self.burst)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= need:
+                    self.tokens -= n
+                    return
+                wait = (need - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self) -> None:
+        """Multiplicative decrease after a 429."""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+
+    def succeeded(self) -> None:
+        """Additive increase back towards the configured rate."""
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+class Backend:
+    """Rate‑limited, concurrency‑capped, retrying wrapper around one API."""
+
+    def __init__(self, name: str, rate: float, burst: float = 1.0, concurrency: int = 4,
+                 attempts: int = 5, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.throttles = 0
+        self.deferred = 0
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform(0, min(max_delay, base · 2^attempt))."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn: Callable[..., T], *args, cost: float = 1.0, **kwargs) -> T:
+        """
+        Run `fn` under the limiter. Transient errors are retried with
+        backoff; after the last attempt they surface as `Deferred`.
+        Everything else propagates unchanged.
+        """
+        for attempt in range(self.attempts):
+            self.bucket.acquire(cost)
+            try:
+                with self.slots:
+                    result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                if is_throttle(e):
+                    self.throttles += 1
+                    self.bucket.throttled()
+                if attempt + 1 < self.attempts:
+                    time.sleep(self.backoff(attempt))
+                    continue
+                self.deferred += 1
+                raise Deferred(f"{self.name}: {e}") from e
+            self.bucket.succeeded()
+            return result
+        raise AssertionError("unreachable")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+sticker_atlas.py – pack sticker thumbnails into a few sprite sheets
+–––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+
+• shelf bin‑packing (next‑fit, decreasing height) into fixed‑size sheets
+• writes packages/stickers/atlas/atlas-<n>.png plus atlas.json:
+    {"version": 1, "sheets": [{"id", "file", "w", "h", "hash"}],
+     "stickers": {id: {"sheet", "x", "y", "w", "h", "hash"}}}
+• incremental: stickers keep their sheet across runs; only sheets whose
+  member set or member thumbnails changed are repacked and re‑encoded
+• a thumbnail too big for a sheet on its own (e.g. a legacy full‑size
+  one) is left out of the atlas with a warning
+"""
+
+import json, logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from catalog_cache import atomic_write_text, file_digest
+
+ATLAS_VERSION = 1
+SHEET_SIZE = (2048, 2048)
+PADDING = 1                     # transparent gutter against bilinear bleed
+
+@dataclass
+class Member:
+    id: str
+    file: Path                  # thumbnail on disk
+    w: int
+    h: int
+    hash: str                   # thumbnail content hash
+
+def member_for(sticker_id: str, thumb: Path) -> Member:
+    with Image.open(thumb) as im:              # header only
+        w, h = im.size
+    return Member(sticker_id, thumb, w, h, file_digest(thumb)[:16])
+
+def shelf_pack(sizes: Dict[str, Tuple[int, int]], sheet: Tuple[int, int] = SHEET_SIZE,
+               pad: int = PADDING) -> Optional[Dict[str, Tuple[int, int]]]:
+    """
+    Place every (w, h) box on shelves, tallest first; → {key: (x, y)} or
+    None if they don't all fit on one sheet.
+    """
+    W, H = sheet
+    pos: Dict[str, Tuple[int, int]] = {}
+    x = y = shelf_h = 0
+    for key in sorted(sizes, key=lambda k: (-sizes[k][1], -sizes[k][0], k)):
+        w, h = sizes[key][0] + pad, sizes[key][1] + pad
+        if w > W:
+            return None
+        if x + w > W:
+            x, y, shelf_h = 0, y + shelf_h, 0
+        if y + h > H:
+            return None
+        pos[key] = (x, y)
+        x += w
+        shelf_h = max(shelf_h, h)
+    return pos
+
+def fits_sheet(m: Member, sheet: Tuple[int, int] = SHEET_SIZE, pad: int = PADDING) -> bool:
+    return m.w + pad <= sheet[0] and m.h + pad <= sheet[1]
+
+def load_index(path: Path) -> Dict:
+    try:
+        index = json.loads(path.read_text(encoding="utf-8"))
+        if index.get("version") == ATLAS_VERSION:
+            return index
+    except (OSError, ValueError):
+        pass
+    return {"version": ATLAS_VERSION, "sheets": [], "stickers": {}}
+
+def assign(prev: Dict, members: Dict[str, Member],
+           sheet: Tuple[int, int] = SHEET_SIZE) -> Tuple[Dict[int, List[str]], set]:
+    """
+    Keep each surviving sticker on its previous sheet, then fill sheets
+    (lowest id first) with newcomers. → ({sheet id: [ids]}, dirty sheet ids)
+    """
+    sheets: Dict[int, List[str]] = {s["id"]: [] for s in prev["sheets"]}
+    dirty: set = set()
+    placed = set()
+    for sid, rec in prev["stickers"].items():
+        m = members.get(sid)
+        if m is None:
+            dirty.add(rec["sheet"])            # sticker removed
+            continue
+        if (m.w, m.h, m.hash) != (rec["w"], rec["h"], rec["hash"]):
+            dirty.add(rec["sheet"])            # thumbnail changed
+        sheets.setdefault(rec["sheet"], []).append(sid)
+        placed.add(sid)
+
+    def fits(ids: List[str]) -> bool:
+        return shelf_pack({i: (members[i].w, members[i].h) for i in ids}, sheet) is not None
+
+    for sid in sorted(set(members) - placed):
+        for n in sorted(sheets):
+            if fits(sheets[n] + [sid]):
+                sheets[n].append(sid)
+                dirty.add(n)
+                break
+        else:
+            n = max(sheets, default=-1) + 1
+            sheets[n] = [sid]
+            dirty.add(n)
+
+    # a grown thumbnail can overflow its sheet – move the overflow out
+    for n in sorted(sheets):
+        while sheets[n] and not fits(sheets[n]):
+            spill = max(sheets) + 1
+            sheets[spill] = [sheets[n].pop()]
+            dirty.update({n, spill})
+    return sheets, dirty
+
+def build_atlas(members: List[Member], out_dir: Path,
+                sheet: Tuple[int, int] = SHEET_SIZE) -> Tuple[int, int]:
+    """Pack `members` into out_dir; → (sheets written, sheets total)."""
+    index_path = out_dir / "atlas.json"
+    prev = load_index(index_path)
+    by_id = {}
+    for m in members:
+        if fits_sheet(m, sheet):
+            by_id[m.id] = m
+        else:
+            logging.warning("Atlas: skipping %s – %d×%d thumbnail exceeds the %d×%d sheet",
+                            m.id, m.w, m.h, *sheet)
+    sheets, dirty = assign(prev, by_id, sheet)
+    old_sheets = {s["id"]: s for s in prev["sheets"]}
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index = {"version": ATLAS_VERSION, "sheets": [], "stickers": {}}
+    written = 0
+    for n in sorted(sheets):
+        ids = sorted(sheets[n])
+        sheet_file = out_dir / f"atlas-{n}.png"
+        if not ids:
+            sheet_file.unlink(missing_ok=True)
+            continue
+        pos = shelf_pack({i: (by_id[i].w, by_id[i].h) for i in ids}, sheet)
+        height = max(pos[i][1] + by_id[i].h for i in ids)
+        if n in dirty or n not in old_sheets or not sheet_file.exists():
+            canvas = Image.new("RGBA", (sheet[0], height), (0, 0, 0, 0))
+            for i in ids:
+                with Image.open(by_id[i].file) as im:
+                    canvas.paste(im.convert("RGBA"), pos[i])
+            canvas.save(sheet_file, "PNG", optimize=True)
+            written += 1
+            digest = file_digest(sheet_file)[:16]
+        else:
+            digest = old_sheets[n]["hash"]
+        index["sheets"].append({"id": n, "file": sheet_file.name,
+                                "w": sheet[0], "h": height, "hash": digest})
+        for i in ids:
+            m = by_id[i]
+            index["stickers"][i] = {"sheet": n, "x": pos[i][0], "y": pos[i][1],
+                                    "w": m.w, "h": m.h, "hash": m.hash}
+
+    text = json.dumps(index, indent=2, ensure_ascii=False, sort_keys=True)
+    if not index_path.exists() or index_path.read_text(encoding="utf-8") != text:
+        atomic_write_text(index_path, text)
+    return written, len(index["sheets"])
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+vision_batch.py – batched Cloud Vision web‑detection for the sticker builder
+––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––––
+
+• groups images into `batch_annotate_images` calls, capped by image count
+  and by raw payload bytes
+• maps every per‑image response (or error) back to the caller's key; a
+  failed RPC is reported against each image of that batch
+• `FakeVisionClient` implements the same call for offline runs
+"""
+
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Callable, Dict, Generic, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
+
+K = TypeVar("K", bound=Hashable)
+
+# Vision accepts up to 16 images per synchronous batch request
+MAX_BATCH_SIZE = 16
+# raw bytes per request; base64 inflates this by ~4/3 on the wire
+DEFAULT_MAX_BYTES = 8 << 20
+
+class VisionImageError(Exception):
+    """Per‑image error returned inside an otherwise successful batch."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+
+@dataclass
+class BatchResult:
+    matches: Optional[int] = None
+    error: Optional[Exception] = None
+
+class VisionBatcher(Generic[K]):
+    """
+    Splits (key, bytes) items into batches and annotates them. `features`
+    may be a zero‑arg callable so the Vision enums are only imported when
+    the first request is built.
+    """
+
+    def __init__(self, client, features: Union[List[Dict], Callable[[], List[Dict]]],
+                 batch_size: int = MAX_BATCH_SIZE, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.client = client
+        self.features = features
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.max_bytes = max_bytes
+        self.rpcs = 0
+
+    def plan(self, sizes: Sequence[Tuple[K, int]]) -> List[List[K]]:
+        """
+        Chunk keys in order so no batch exceeds `batch_size` images or
+        `max_bytes` payload; an image larger than the cap gets its own batch.
+        """
+        return list(self.batches(sizes))
+
+    def batches(self, sizes: Iterable[Tuple[K, int]]) -> Iterator[List[K]]:
+        """`plan`, lazily: a batch is yielded once it is full or the next key won't fit."""
+        cur: List[K] = []
+        cur_bytes = 0
+        for key, size in sizes:
+            if cur and cur_bytes + size > self.max_bytes:
+                yield cur
+                cur, cur_bytes = [], 0
+            cur.append(key)
+            cur_bytes += size
+            if len(cur) >= self.batch_size:
+                yield cur
+                cur, cur_bytes = [], 0
+        if cur:
+            yield cur
+
+    def annotate_batch(self, items: Sequence[Tuple[K, bytes]]) -> Dict[K, BatchResult]:
+        """One RPC for `items`; every key gets a BatchResult."""
+        features = self.features() if callable(self.features) else self.features
+        requests = [{"image": {"content": content}, "features": features}
+                    for _, content in items]
+        self.rpcs += 1
+        try:
+            resp = self.client.batch_annotate_images(requests=requests)
+        except Exception as e:
+            return {key: BatchResult(error=e) for key, _ in items}
+
+        out: Dict[K, BatchResult] = {}
+        responses = list(resp.responses)
+        for i, (key, _) in enumerate(items):
+            if i >= len(responses):
+                out[key] = BatchResult(error=VisionImageError(2, "missing response"))
+                continue
+            r = responses[i]
+            if r.error is not None and r.error.code:
+                out[key] = BatchResult(error=VisionImageError(r.error.code, r.error.message))
+            else:
+                out[key] = BatchResult(matches=len(r.web_detection.pages_with_matching_images))
+        return out
+
+    def annotate(self, items: Sequence[Tuple[K, bytes]]) -> Dict[K, BatchResult]:
+        """Plan and annotate all `items`, one RPC per planned batch."""
+        content = dict(items)
+        out: Dict[K, BatchResult] = {}
+        for keys in self.plan([(k, len(b)) for k, b in items]):
+            out.update(self.annotate_batch([(k, content[k]) for k in keys]))
+        return out
+
+# ── offline stand‑in ────────────────────────────────────────────────────
+class FakeVisionClient:
+    """
+    Minimal `ImageAnnotatorClient` look‑alike. `matches(content)` returns
+    the match count for an image, or raises to produce a per‑image error;
+    `fail_rpc(requests)` may raise to fail a whole batch; every RPC
+    sleeps `latency` seconds, like a round trip would.
+    """
+
+    def __init__(self, matches: Callable[[bytes], int] = lambda content: 0,
+                 fail_rpc: Optional[Callable[[List[Dict]], None]] = None,
+                 latency: float = 0.0):
+        self.matches = matches
+        self.fail_rpc = fail_rpc
+        self.latency = latency
+        self.calls: List[int] = []
+
+    def batch_annotate_images(self, requests: List[Dict]):
+        self.calls.append(len(requests))
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_rpc is not None:
+            self.fail_rpc(requests)
+        responses = []
+        for req in requests:
+            try:
+                n = self.matches(req["image"]["content"])
+                responses.append(SimpleNamespace(
+                    error=SimpleNamespace(code=0, message=""),
+                    web_detection=SimpleNamespace(pages_with_matching_images=[None] * n)))
+            except Exception as e:
+                responses.append(SimpleNamespace(
+                    error=SimpleNamespace(code=13, message=str(e)),
+                    web_detection=SimpleNamespace(pages_with_matching_images=[])))
+        return SimpleNamespace(responses=responses)
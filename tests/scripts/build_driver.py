@@ -0,0 +1,55 @@
+"""
+Offline build_sticker_catalog.py run for tests: Vision and Gemini are the
+deterministic stand‑ins from bench_sticker_catalog; CRASH_AT=n kills the
+process (no cleanup, like SIGKILL) when the n‑th entry is built;
+VISION_FAIL / GEMINI_FAIL=<ExceptionName> make every call to that API
+raise an exception of that name (e.g. PermissionDenied, ServiceUnavailable),
+or only the first n calls with VISION_FAIL_CALLS / GEMINI_FAIL_CALLS=n.
+"""
+
+import itertools, os, sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+
+import bench_sticker_catalog as bench
+import build_sticker_catalog as b
+from vision_batch import FakeVisionClient
+
+b.vision_batcher.client = b.LimitedVisionClient(FakeVisionClient(bench.fake_matches))
+b.vision_batcher.features = []
+b._clients["gemini"] = bench.FakeGeminiModel(0.0)
+b.RETRY_PAUSE = 0.0
+b.VISION_API.base_delay = b.GEMINI_API.base_delay = 0.0
+
+def failing(name, calls, ok=lambda *args, **kwargs: None):
+    exc, made = type(name, (Exception,), {}), itertools.count()
+    def fail(*args, **kwargs):
+        if calls and next(made) >= int(calls):
+            return ok(*args, **kwargs)
+        raise exc(f"{name} (test)")
+    return fail
+
+if os.environ.get("VISION_FAIL"):
+    b.vision_batcher.client.client.fail_rpc = failing(
+        os.environ["VISION_FAIL"], os.environ.get("VISION_FAIL_CALLS"))
+if os.environ.get("GEMINI_FAIL"):
+    gemini = b._clients["gemini"]
+    gemini.generate_content = failing(
+        os.environ["GEMINI_FAIL"], os.environ.get("GEMINI_FAIL_CALLS"), gemini.generate_content)
+
+crash_at = int(os.environ.get("CRASH_AT") or 0)
+if crash_at:
+    built = 0
+    build_entry = b.build_entry
+
+    def crashing_build_entry(*args):
+        global built
+        built += 1
+        if built == crash_at:
+            os._exit(3)
+        return build_entry(*args)
+
+    b.build_entry = crashing_build_entry
+
+b.main(sys.argv[1:])
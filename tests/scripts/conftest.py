@@ -0,0 +1,49 @@
+"""
+Shared fixtures for the scripts/ tests: the scripts directory on sys.path,
+synthetic sticker trees and offline builder runs in a subprocess (ROOT is
+fixed at import time, so every build gets its own STICKER_ROOT; tests that
+import the builder directly get a throwaway one).
+"""
+
+import os, shutil, subprocess, sys, tempfile
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+SCRIPTS = Path(__file__).resolve().parents[2] / "scripts"
+DRIVER = Path(__file__).resolve().parent / "build_driver.py"
+sys.path.insert(0, str(SCRIPTS))
+os.environ.setdefault("STICKER_ROOT", tempfile.mkdtemp(prefix="sticker-root-"))
+
+def make_root(root: Path, n: int, animated_every: int = 0) -> Path:
+    """ROOT with `n` flat synthetic stickers under packages/stickers/."""
+    from bench_sticker_catalog import make_sticker
+    packs = root / "packages" / "stickers"
+    packs.mkdir(parents=True)
+    for i in range(n):
+        animated = bool(animated_every) and i % animated_every == 0
+        make_sticker((packs / f"s_{i:03d}.webp", i, animated))
+    return root
+
+def run_build(root: Path, *argv: str, crash_at: int = 0,
+              **fail: str) -> subprocess.CompletedProcess:
+    """Offline build; vision_fail=/gemini_fail=<ExceptionName> fail that API."""
+    env = dict(os.environ, STICKER_ROOT=str(root), CRASH_AT=str(crash_at),
+               **{k.upper(): v for k, v in fail.items()})
+    return subprocess.run([sys.executable, str(DRIVER), *argv], env=env, cwd=SCRIPTS,
+                          capture_output=True, text=True)
+
+def outputs(root: Path) -> Dict[str, bytes]:
+    """Every build output (not caches or logs), by relative path."""
+    return {str(p.relative_to(root)): p.read_bytes() for p in sorted(root.rglob("*"))
+            if p.is_file() and p.relative_to(root).parts[0] not in (".cache", "logs")}
+
+@pytest.fixture
+def tree(tmp_path):
+    """Factory: tree(name, n) → a fresh ROOT; identical for equal n."""
+    def make(name: str, n: int, animated_every: int = 0) -> Path:
+        root = tmp_path / name
+        shutil.rmtree(root, ignore_errors=True)
+        return make_root(root, n, animated_every)
+    return make
@@ -0,0 +1,24 @@
+import json
+
+from PIL import Image
+
+from sticker_atlas import build_atlas, member_for
+
+def thumb(path, size):
+    Image.new("RGBA", size, (200, 40, 40, 255)).save(path)
+    return path
+
+def test_oversized_thumbnails_are_left_out(tmp_path):
+    members = [member_for(f"s{i}", thumb(tmp_path / f"s{i}.png", size))
+               for i, size in enumerate([(128, 128), (3000, 90), (90, 2048), (120, 64)])]
+    assert build_atlas(members, tmp_path / "atlas") == (1, 1)
+    index = json.loads((tmp_path / "atlas/atlas.json").read_text())
+    assert sorted(index["stickers"]) == ["s0", "s3"]
+
+def test_thumbnail_grown_past_the_sheet_leaves_it(tmp_path):
+    members = [member_for(f"s{i}", thumb(tmp_path / f"s{i}.png", (128, 128))) for i in range(3)]
+    build_atlas(members, tmp_path / "atlas")
+    members[1] = member_for("s1", thumb(tmp_path / "s1.png", (2100, 300)))
+    assert build_atlas(members, tmp_path / "atlas") == (1, 1)
+    index = json.loads((tmp_path / "atlas/atlas.json").read_text())
+    assert sorted(index["stickers"]) == ["s0", "s2"]
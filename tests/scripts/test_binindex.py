@@ -0,0 +1,40 @@
+from catalog_binindex import BinIndex, encode_index
+
+ENTRIES = [
+    {"id": "pepe", "name": "Pepe", "file": "pepe.webp", "width": 512, "height": 480,
+     "animated": False, "defaultPosition": {"x": 0.5, "y": 0.25}, "thumb": "pepe-thumb.png",
+     "viralityTier": 3, "priceUSD": 12.5},
+    {"id": "dancing_cat", "name": "Dancing Cat", "file": "dancing_cat.webp", "width": 300,
+     "height": 300, "animated": True, "frames": 24, "durationMs": 2400, "bytes": 91234,
+     "defaultPosition": {"x": 0.5, "y": 0.5}, "thumb": "dancing_cat-thumb.png",
+     "viralityTier": 1, "priceUSD": 10},
+    {"id": "Ünïcode", "name": "Ünïcode", "file": "Ünïcode.webp", "width": 64, "height": 64,
+     "animated": False, "defaultPosition": {"x": 0.1, "y": 0.9}, "thumb": "Ünïcode-thumb.png",
+     "viralityTier": 4, "priceUSD": 20,
+     "thumbs": [{"w": 64, "h": 64, "bytes": 900, "file": "Ünïcode-thumb-64.png"}]},
+]
+
+def write(tmp_path, entries):
+    path = tmp_path / "index.bin"
+    path.write_bytes(encode_index(entries))
+    return path
+
+def test_round_trip(tmp_path):
+    with BinIndex(write(tmp_path, ENTRIES)) as idx:
+        assert len(idx) == 3
+        assert [r.id for r in idx] == sorted((e["id"] for e in ENTRIES), key=str.encode)
+        for e in ENTRIES:
+            want = {k: v for k, v in e.items() if k != "thumbs"}
+            assert idx.find(e["id"]).to_dict() == want
+
+def test_find_misses(tmp_path):
+    with BinIndex(write(tmp_path, ENTRIES)) as idx:
+        assert idx.find("nope") is None
+        assert "pepe" in idx and "pep" not in idx and "pepez" not in idx
+
+def test_encoding_is_deterministic():
+    assert encode_index(ENTRIES) == encode_index(list(reversed(ENTRIES)))
+
+def test_empty_index(tmp_path):
+    with BinIndex(write(tmp_path, [])) as idx:
+        assert len(idx) == 0 and idx.find("pepe") is None
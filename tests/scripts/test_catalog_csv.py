@@ -0,0 +1,38 @@
+import csv
+
+from build_sticker_catalog import CSV_HEADER, CatalogWriter
+
+def row(handle, price="1.00"):
+    return [handle, handle.upper()] + [""] * (len(CSV_HEADER) - 3) + [price]
+
+def on_disk(path):
+    with path.open(newline="") as f:
+        return list(csv.reader(f))
+
+def test_upserts_keep_row_order(tmp_path):
+    path = tmp_path / "product_catalog.csv"
+    writer = CatalogWriter(path, checkpoint=0)
+    for handle in ("b", "a", "c"):
+        writer.upsert(row(handle))
+    writer.flush()
+
+    writer = CatalogWriter(path, checkpoint=0)
+    writer.upsert(row("a", "5.00"))            # updated in place
+    writer.upsert(row("d"))                    # new handles append
+    writer.upsert(row("c"))                    # unchanged: not even pending
+    assert writer.pending == 2
+    assert writer.remove("b") and not writer.remove("zz")
+    writer.flush()
+    assert on_disk(path) == [CSV_HEADER, row("a", "5.00"), row("c"), row("d")]
+
+def test_checkpoint_flushes_every_n_upserts(tmp_path):
+    path = tmp_path / "product_catalog.csv"
+    writer = CatalogWriter(path, checkpoint=2)
+    writer.upsert(row("a"))
+    assert not path.exists()
+    writer.upsert(row("b"))
+    assert on_disk(path) == [CSV_HEADER, row("a"), row("b")]
+    writer.upsert(row("c"))                    # not yet at the next checkpoint
+    assert len(on_disk(path)) == 3
+    writer.flush()
+    assert on_disk(path)[-1] == row("c")
@@ -0,0 +1,40 @@
+import os
+
+from conftest import outputs, run_build
+
+def test_noop_build_reads_no_manifest_or_index(tree):
+    root = tree("noop", 6)
+    assert run_build(root).returncode == 0
+    packs = root / "packages/stickers"
+    before = outputs(root)
+    # a no‑op run must not even open these: garbage in them goes unnoticed
+    for path in (packs / "s_002/manifest.json", packs / "index.json",
+                 packs / "index.bin", packs / "search.json"):
+        path.write_bytes(b"\0 not json")
+    planted = outputs(root)
+
+    proc = run_build(root)
+    assert proc.returncode == 0, proc.stderr
+    assert "0 new or changed" in proc.stdout
+    assert outputs(root) == planted
+
+    # one real change rewrites them all from memory again
+    for path, data in before.items():
+        (root / path).write_bytes(data)
+    src = packs / "s_004/s_004.webp"
+    st = src.stat()
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert run_build(root).returncode == 0
+    assert outputs(root) == before
+
+def test_index_comes_from_memory_not_other_manifests(tree):
+    root = tree("indexed", 6)
+    assert run_build(root).returncode == 0
+    packs = root / "packages/stickers"
+    index = (packs / "index.json").read_bytes()
+    (packs / "s_002/manifest.json").write_bytes(b"\0 not json")
+    src = packs / "s_004/s_004.webp"
+    st = src.stat()
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert run_build(root).returncode == 0
+    assert (packs / "index.json").read_bytes() == index
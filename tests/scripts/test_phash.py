@@ -0,0 +1,36 @@
+from PIL import Image, ImageDraw
+
+from phash import MultiIndex, clusters, dhash, hamming
+
+def test_clusters_are_transitive_and_sorted():
+    far = 0xFF << 40
+    hashes = {"a": 0b0000, "b": 0b0011, "c": 0b1111, "d": far, "e": far | 1, "f": 0xFFFF << 16}
+    # a–b (2), b–c (2) chain even though a–c is 4 apart; d–e (1); f alone
+    assert clusters(hashes, radius=2) == [["a", "b", "c"], ["d", "e"]]
+
+def test_radius_zero_groups_only_identical_hashes():
+    assert clusters({"a": 5, "b": 5, "c": 4}, radius=0) == [["a", "b"]]
+
+def test_no_clusters():
+    assert clusters({"a": 0, "b": (1 << 64) - 1}) == []
+    assert clusters({}) == []
+
+def test_multi_index_matches_brute_force():
+    import random
+    rng = random.Random(7)
+    base = [rng.getrandbits(64) for _ in range(40)]
+    hashes = {i: h ^ (1 << rng.randrange(64)) if i % 2 else h for i, h in enumerate(base * 2)}
+    index = MultiIndex(radius=6)
+    for k, h in hashes.items():
+        index.add(k, h)
+    for h in base[:10]:
+        want = sorted((k, hamming(h, v)) for k, v in hashes.items() if hamming(h, v) <= 6)
+        assert sorted(index.search(h)) == want
+
+def test_dhash_survives_resizing():
+    im = Image.new("RGBA", (400, 300), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(im)
+    draw.ellipse((40, 30, 260, 250), fill=(220, 30, 30, 255))
+    draw.rectangle((200, 100, 380, 280), fill=(30, 30, 220, 200))
+    assert hamming(dhash(im), dhash(im.resize((123, 92)))) <= 6
+    assert hamming(dhash(im), dhash(im.transpose(Image.FLIP_LEFT_RIGHT))) > 6
@@ -0,0 +1,9 @@
+from conftest import outputs, run_build
+
+def test_parallel_build_is_byte_identical_to_serial(tree):
+    serial, parallel = tree("serial", 24, animated_every=5), tree("parallel", 24, animated_every=5)
+    assert run_build(serial, "--jobs", "1").returncode == 0
+    proc = run_build(parallel, "--jobs", "4", "--vision-batch", "3")
+    assert proc.returncode == 0, proc.stderr
+
+    assert outputs(parallel) == outputs(serial)
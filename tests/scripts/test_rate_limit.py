@@ -0,0 +1,56 @@
+import pytest
+
+from rate_limit import Deferred, is_throttle, is_transient
+
+class Coded(Exception):
+    def __init__(self, code):
+        super().__init__(f"status {code}")
+        self.code = code
+
+class RpcError(Exception):
+    """grpc style: code() returns a StatusCode whose value is (int, name)."""
+
+    class StatusCode:
+        def __init__(self, value):
+            self.value = value
+
+    def __init__(self, value):
+        super().__init__("rpc failed")
+        self._status = self.StatusCode(value)
+
+    def code(self):
+        return self._status
+
+class ResourceExhausted(Exception):
+    pass
+
+class ServiceUnavailable(Exception):
+    pass
+
+@pytest.mark.parametrize("exc", [
+    TimeoutError(), ConnectionResetError(), Deferred("later"),
+    Coded(429), Coded(8), Coded(503), Coded(504), Coded(4), Coded(14),
+    RpcError((8, "resource exhausted")), RpcError((14, "unavailable")),
+    ResourceExhausted(), ServiceUnavailable(),
+    RuntimeError("429 RESOURCE_EXHAUSTED: quota"),
+])
+def test_transient(exc):
+    assert is_transient(exc)
+
+@pytest.mark.parametrize("exc", [
+    ValueError("bad image"), Coded(400), Coded(3), Coded("8"),
+    RpcError((3, "invalid argument")), KeyError("x"),
+])
+def test_not_transient(exc):
+    assert not is_transient(exc)
+
+def test_only_quota_errors_throttle():
+    assert is_throttle(Coded(429)) and is_throttle(RpcError((8, "")))
+    assert not is_throttle(Coded(503)) and not is_throttle(TimeoutError())
+
+def test_broken_code_accessor_is_not_fatal():
+    class Broken(Exception):
+        def code(self):
+            raise RuntimeError("no status")
+
+    assert not is_transient(Broken())
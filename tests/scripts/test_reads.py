@@ -0,0 +1,21 @@
+import re
+
+from conftest import run_build
+
+def reads(proc):
+    """(files read, bytes read) from the run summary."""
+    files = re.search(r"^read\s+(\d+)\s", proc.stdout, re.M)
+    size = re.search(r"^asset\.bytes\s+(\d+)$", proc.stdout, re.M)
+    return (int(files.group(1)) if files else 0), (int(size.group(1)) if size else 0)
+
+def test_each_sticker_is_read_once(tree):
+    root = tree("reads", 12, animated_every=4)
+    total = sum(p.stat().st_size for p in (root / "packages/stickers").glob("*.webp"))
+    for jobs in ("1", "3"):
+        proc = run_build(root, "--no-cache", "--jobs", jobs)
+        assert proc.returncode == 0, proc.stderr
+        assert reads(proc) == (12, total)          # hash, decode and scoring share one read
+
+    assert run_build(root).returncode == 0
+    proc = run_build(root, "--full-scan")          # hashes come from the snapshot
+    assert proc.returncode == 0 and reads(proc) == (0, 0)
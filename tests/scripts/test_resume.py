@@ -0,0 +1,22 @@
+import json
+
+from conftest import outputs, run_build
+
+def test_crash_then_resume_matches_clean_build(tree):
+    clean, crashed = tree("clean", 15), tree("crashed", 15)
+    assert run_build(clean).returncode == 0
+
+    assert run_build(crashed, crash_at=8).returncode == 3
+    resumed = run_build(crashed, "--resume")
+    assert resumed.returncode == 0, resumed.stderr
+    assert "Resumed 7 sticker(s)" in resumed.stdout
+
+    assert outputs(crashed) == outputs(clean)
+
+def test_replayed_manifest_keeps_entry_key_order(tree):
+    root = tree("crashed", 6)
+    assert run_build(root, crash_at=4).returncode == 3
+    assert run_build(root, "--resume").returncode == 0
+    entry = json.loads((root / "packages/stickers/s_000/manifest.json").read_text())[0]
+    assert list(entry)[:4] == ["id", "name", "file", "width"]
+    assert list(entry["thumbs"][0]) == ["w", "h", "bytes", "file"]
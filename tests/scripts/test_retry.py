@@ -0,0 +1,44 @@
+import csv, json
+
+from bench_sticker_catalog import make_sticker
+from catalog_cache import JsonlStore
+from conftest import run_build
+
+def stored(root):
+    return JsonlStore(root / ".cache/virality_scores.jsonl").data
+
+def handles(root):
+    with (root / "product_catalog.csv").open(newline="") as f:
+        return {row[0] for row in list(csv.reader(f))[1:]}
+
+def test_deferred_stickers_are_scored_in_a_retry_round(tree):
+    clean, flaky = tree("clean", 5), tree("flaky", 5)
+    assert run_build(clean).returncode == 0
+    # one RPC's worth of attempts fails, so the main pass defers every sticker
+    proc = run_build(flaky, vision_fail="ServiceUnavailable", vision_fail_calls="5")
+    assert proc.returncode == 0, proc.stderr
+
+    assert "Retry round 1: 5 deferred" in (flaky / "logs/sticker_build.log").read_text()
+    assert {k: r["matches"] for k, r in stored(flaky).items()} == \
+           {k: r["matches"] for k, r in stored(clean).items()}
+    assert handles(flaky) == handles(clean)
+
+def test_out_of_retries_falls_back_to_the_previous_score(tree):
+    root = tree("throttled", 4)
+    packs = root / "packages/stickers"
+    assert run_build(root).returncode == 0
+    before = stored(root)
+    tiers = {p.parent.name: json.loads(p.read_text())[0]["viralityTier"]
+             for p in packs.glob("*/manifest.json")}
+    make_sticker((packs / "s_new.webp", 99, False))
+
+    proc = run_build(root, "--score-ttl", "0", vision_fail="ServiceUnavailable")
+    assert proc.returncode == 0, proc.stderr
+    assert stored(root) == before                       # nothing re‑scored …
+    assert {p.parent.name: json.loads(p.read_text())[0]["viralityTier"]
+            for p in packs.glob("*/manifest.json")} == tiers   # … old tiers kept
+    assert "s_new" not in handles(root)                 # no score yet: left for next run
+    assert not (packs / "s_new/manifest.json").exists()
+
+    assert run_build(root).returncode == 0
+    assert "s_new" in handles(root)
@@ -0,0 +1,57 @@
+from build_sticker_catalog import plan_rescore, virality_to_tier
+from catalog_cache import JsonlStore
+from conftest import run_build
+
+DAY = 86400.0
+
+def stored(root):
+    return JsonlStore(root / ".cache/virality_scores.jsonl").data
+
+def test_permanent_vision_error_stores_no_score(tree):
+    root = tree("denied", 6)
+    assert run_build(root, vision_fail="PermissionDenied").returncode == 0
+    assert stored(root) == {}
+    assert not (root / "packages/stickers/s_000/manifest.json").exists()
+
+def test_failed_rescore_keeps_the_previous_score(tree):
+    root = tree("rescore", 6)
+    assert run_build(root).returncode == 0
+    before = stored(root)
+    assert run_build(root, "--full-scan", "--score-ttl", "0",
+                     vision_fail="InvalidArgument").returncode == 0
+    assert stored(root) == before
+
+    assert run_build(root, "--full-scan", "--score-ttl", "0",
+                     gemini_fail="PermissionDenied").returncode == 0
+    after = stored(root)
+    needs_gemini = {k for k, r in before.items() if virality_to_tier(r["matches"]) == 1}
+    assert needs_gemini and all(after[k] == before[k] for k in needs_gemini)
+    assert all(after[k]["scoredAt"] > before[k]["scoredAt"] for k in before.keys() - needs_gemini)
+
+def test_gemini_failure_is_not_priced_as_tier_1(tree):
+    root = tree("gemini", 12)
+    assert run_build(root, gemini_fail="DefaultCredentialsError").returncode == 0
+    recs = stored(root).values()
+    assert recs and all(virality_to_tier(r["matches"]) > 1 for r in recs)
+    assert all(r["gemini"] is None for r in recs)
+
+def test_plan_rescore_takes_the_stalest_within_budget(tmp_path):
+    scores, now = JsonlStore(tmp_path / "scores.jsonl"), 100 * DAY
+    for digest, age in (("fresh", 1), ("old", 40), ("older", 50), ("oldest", 90)):
+        scores.put(digest, {"matches": 0, "gemini": 2, "scoredAt": now - age * DAY})
+    digests = ["fresh", "old", "older", "oldest", "new", "new"]
+
+    assert plan_rescore(scores, digests, None, None, now) == {"new"}
+    assert plan_rescore(scores, digests, 30, None, now) == {"new", "old", "older", "oldest"}
+    assert plan_rescore(scores, digests, 30, 2, now) == {"new", "older", "oldest"}
+    assert plan_rescore(scores, digests, 30, 0, now) == {"new"}
+    assert plan_rescore(scores, digests, 60, 5, now) == {"new", "oldest"}
+    scores.close()
+
+def test_rescore_budget_limits_refreshes_per_run(tree):
+    root = tree("budget", 6)
+    assert run_build(root).returncode == 0
+    before = stored(root)
+    assert run_build(root, "--score-ttl", "0", "--rescore-budget", "2").returncode == 0
+    after = stored(root)
+    assert sum(after[k]["scoredAt"] != before[k]["scoredAt"] for k in before) == 2
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from catalog_search import SearchIndex, build_search_index, dump_search_index, tokenize
+
+ENTRIES = [{"id": i, "name": i.replace("_", " ").title()} for i in [
+    "DistractedBoyfriend", "distracted_girlfriend", "boyfriend_meme", "this_is_fine",
+    "this_is_fine_v2", "fine_dog", "mallard_advice", "advice_dog", "dog", "cat_dog",
+]]
+TAGS = {"fine_dog": ["coffee"], "this_is_fine_v2": ["fire"], "cat_dog": ["pets"]}
+
+@pytest.fixture(scope="module")
+def idx():
+    return SearchIndex(json.loads(dump_search_index(build_search_index(ENTRIES, TAGS))))
+
+def test_tokenize():
+    assert tokenize("DistractedBoyfriend_v2") == ["distracted", "boyfriend", "v", "2"]
+    assert tokenize("HTMLParser-x 1990s") == ["html", "parser", "x", "1990", "s"]
+
+def test_exact_word_ranks_shorter_ids_first(idx):
+    assert idx.search("dog") == ["dog", "cat_dog", "fine_dog", "advice_dog"]
+
+def test_every_word_must_match(idx):
+    assert idx.search("this fine") == ["this_is_fine", "this_is_fine_v2"]
+    assert idx.search("advice dog") == ["advice_dog"]
+    assert idx.search("advice cat") == []
+
+def test_last_word_is_a_prefix(idx):
+    assert idx.prefix("mallard adv") == ["mallard_advice"]
+    assert idx.prefix("distr") == ["DistractedBoyfriend", "distracted_girlfriend"]
+    assert idx.prefix("adv mallard") == []
+
+def test_exact_beats_prefix_beats_fuzzy(idx):
+    assert idx.search("boyfriend") == ["boyfriend_meme", "DistractedBoyfriend"]
+    # "fire" is exact for the tagged sticker, one edit from "fine" for the rest
+    assert idx.search("fire") == ["this_is_fine_v2", "fine_dog", "this_is_fine"]
+    assert idx.search("fire dog") == ["fine_dog"]
+    assert idx.search("girlfriend boy") == []
+    assert idx.search("distracted boyfrend") == ["DistractedBoyfriend"]
+    assert idx.prefix("distracted boyfrend") == []
+
+def test_tags_are_searchable(idx):
+    assert idx.search("coffee") == ["fine_dog"]
+    assert idx.search("pets dog") == ["cat_dog"]
+
+def test_limit(idx):
+    assert idx.search("dog", limit=2) == ["dog", "cat_dog"]
+    assert idx.search("this f", limit=1) == ["this_is_fine"]
+
+def test_version_is_checked():
+    with pytest.raises(ValueError):
+        SearchIndex({"version": 0})
@@ -0,0 +1,28 @@
+import json
+
+from PIL import Image
+
+from conftest import run_build
+
+def test_new_near_duplicates_share_one_score(tree):
+    root = tree("dupes", 3)
+    packs = root / "packages/stickers"
+    with Image.open(packs / "s_000.webp") as im:   # a re‑encode: same dHash, new content hash
+        im.save(packs / "s_000_copy.webp", "WEBP", quality=60)
+    assert run_build(root, "--share-cluster-scores").returncode == 0
+
+    store = [json.loads(line) for line in (root / ".cache/virality_scores.jsonl").open()]
+    assert len({r["key"] for r in store}) == 3      # the copy got no record of its own
+
+def test_copy_added_later_joins_the_existing_cluster(tree):
+    root = tree("later", 3)
+    packs = root / "packages/stickers"
+    assert run_build(root, "--share-cluster-scores").returncode == 0
+    with Image.open(packs / "s_000/s_000.webp") as im:
+        im.save(packs / "s_000_copy.webp", "WEBP", quality=60)
+    assert run_build(root, "--share-cluster-scores").returncode == 0
+
+    store = [json.loads(line) for line in (root / ".cache/virality_scores.jsonl").open()]
+    assert len({r["key"] for r in store}) == 3
+    manifests = {p.parent.name: json.loads(p.read_text())[0] for p in packs.glob("s_000*/manifest.json")}
+    assert manifests["s_000"]["viralityTier"] == manifests["s_000_copy"]["viralityTier"]
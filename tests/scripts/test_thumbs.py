@@ -0,0 +1,64 @@
+import json
+
+from PIL import Image
+
+from conftest import run_build
+
+def manifest_entry(root, name):
+    return json.loads((root / f"packages/stickers/{name}/manifest.json").read_text())[0]
+
+def test_regenerated_thumbs_refresh_manifest_metadata(tree):
+    root = tree("regen", 3)
+    packs = root / "packages/stickers"
+    folder = packs / "s_001"
+    folder.mkdir()
+    (packs / "s_001.webp").rename(folder / "s_001.webp")
+    # a legacy full‑size thumbnail: the first build lists it as it is …
+    Image.new("RGBA", (600, 400), (255, 0, 0, 255)).save(folder / "s_001-thumb.png")
+    assert run_build(root).returncode == 0
+    assert manifest_entry(root, "s_001")["thumbs"][1]["w"] == 600
+    # … and --regenerate-thumbs replaces it, so the cached metadata is stale
+    assert run_build(root, "--regenerate-thumbs").returncode == 0
+
+    for rung in manifest_entry(root, "s_001")["thumbs"]:
+        path = folder / rung["file"]
+        assert rung["bytes"] == path.stat().st_size
+        with Image.open(path) as im:
+            assert (rung["w"], rung["h"]) == im.size
+
+def test_ladder_skips_rungs_that_would_upscale(tree):
+    root = tree("upscale", 1)
+    src = root / "packages/stickers/s_000.webp"
+    with Image.open(src) as im:                 # opaque, so the crop is the whole 300×200
+        opaque = Image.new("RGBA", (300, 200), (255, 255, 255, 255))
+        opaque.alpha_composite(im.convert("RGBA").resize((300, 200)))
+        opaque.save(src, "WEBP", lossless=True)
+    assert run_build(root, "--thumb-format", "webp").returncode == 0
+
+    # 64, 128 and 256 fit inside the 300 px crop; 512 would only repeat it
+    assert [r["w"] for r in manifest_entry(root, "s_000")["thumbs"]] == [64, 128, 256]
+    assert not (root / "packages/stickers/s_000/s_000-thumb-512.webp").exists()
+
+def test_ladder_drops_rungs_heavier_than_the_source(tree):
+    root = tree("heavy", 1)
+    src = root / "packages/stickers/s_000.webp"
+    with Image.open(src) as im:                 # a few hundred bytes: PNG rungs outweigh it
+        im.resize((200, 150)).save(src, "WEBP", quality=50)
+    assert run_build(root).returncode == 0
+
+    # only the primary thumbnail is kept, whatever it weighs
+    assert [r["file"] for r in manifest_entry(root, "s_000")["thumbs"]] == ["s_000-thumb.png"]
+    assert not (root / "packages/stickers/s_000/s_000-thumb-64.png").exists()
+
+def test_heavy_primary_is_not_regenerated_every_run(tree):
+    root = tree("heavy-regen", 1)
+    src = root / "packages/stickers/s_000.webp"
+    with Image.open(src) as im:
+        im.resize((200, 150)).save(src, "WEBP", quality=50)
+    assert run_build(root).returncode == 0
+    thumb = root / "packages/stickers/s_000/s_000-thumb.png"
+    assert thumb.stat().st_size > (root / "packages/stickers/s_000/s_000.webp").stat().st_size
+
+    proc = run_build(root, "--regenerate-thumbs")
+    assert proc.returncode == 0
+    assert "Rebuilt 0 thumbnail(s)" in proc.stdout
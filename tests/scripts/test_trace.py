@@ -0,0 +1,12 @@
+import json
+
+from conftest import run_build
+
+def test_parallel_trace_is_one_event_per_line(tree, tmp_path):
+    root, trace = tree("traced", 30, animated_every=5), tmp_path / "trace.json"
+    assert run_build(root, "--jobs", "4", "--trace", str(trace)).returncode == 0
+    head, *lines = trace.read_text().splitlines()
+    assert head == "["
+    events = [json.loads(line.removesuffix(",")) for line in lines]
+    assert len({json.dumps(e, sort_keys=True) for e in events}) == len(events)
+    assert sum(e["name"] == "decode" for e in events) == 30
@@ -0,0 +1,63 @@
+from vision_batch import BatchResult, FakeVisionClient, VisionBatcher, VisionImageError
+
+def matches(content: bytes) -> int:
+    if content.startswith(b"bad"):
+        raise ValueError("unreadable image")
+    return len(content)
+
+def test_plan_caps_images_and_bytes():
+    batcher = VisionBatcher(FakeVisionClient(), [], batch_size=3, max_bytes=100)
+    sizes = [("a", 10), ("b", 10), ("c", 10), ("d", 10), ("e", 60), ("f", 50), ("g", 500), ("h", 1)]
+    assert batcher.plan(sizes) == [["a", "b", "c"], ["d", "e"], ["f"], ["g"], ["h"]]
+
+def test_batch_size_is_capped_at_the_api_limit():
+    assert VisionBatcher(FakeVisionClient(), [], batch_size=99).batch_size == 16
+    assert VisionBatcher(FakeVisionClient(), [], batch_size=0).batch_size == 1
+
+def test_annotate_maps_results_back_to_keys():
+    client = FakeVisionClient(matches)
+    batcher = VisionBatcher(client, [], batch_size=2)
+    items = [("a", b"x"), ("b", b"xyz"), ("c", b"xy")]
+    assert batcher.annotate(items) == {"a": BatchResult(1), "b": BatchResult(3), "c": BatchResult(2)}
+    assert client.calls == [2, 1]
+    assert batcher.rpcs == 2
+
+def test_per_image_error_stays_with_its_image():
+    out = VisionBatcher(FakeVisionClient(matches), []).annotate([("ok", b"xx"), ("bad", b"bad!")])
+    assert out["ok"] == BatchResult(matches=2)
+    err = out["bad"].error
+    assert isinstance(err, VisionImageError) and err.code == 13
+    assert "unreadable image" in err.message
+
+def test_failed_rpc_is_reported_against_each_image_of_its_batch():
+    def fail_rpc(requests):
+        if any(r["image"]["content"] == b"boom" for r in requests):
+            raise TimeoutError("deadline exceeded")
+
+    batcher = VisionBatcher(FakeVisionClient(matches, fail_rpc), [], batch_size=2)
+    out = batcher.annotate([("a", b"boom"), ("b", b"xx"), ("c", b"xyz")])
+    assert isinstance(out["a"].error, TimeoutError)
+    assert out["b"].error is out["a"].error
+    assert out["c"] == BatchResult(matches=3)
+
+def test_missing_response_is_an_error():
+    class Short(FakeVisionClient):
+        def batch_annotate_images(self, requests):
+            resp = super().batch_annotate_images(requests)
+            resp.responses = resp.responses[:1]
+            return resp
+
+    out = VisionBatcher(Short(matches), []).annotate([("a", b"x"), ("b", b"y")])
+    assert out["a"] == BatchResult(matches=1)
+    assert out["b"].error.code == 2
+
+def test_features_callable_is_resolved_per_request():
+    seen = []
+
+    class Spy(FakeVisionClient):
+        def batch_annotate_images(self, requests):
+            seen.extend(r["features"] for r in requests)
+            return super().batch_annotate_images(requests)
+
+    VisionBatcher(Spy(), lambda: [{"type": "WEB_DETECTION"}]).annotate([("a", b"x")])
+    assert seen == [[{"type": "WEB_DETECTION"}]]
@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+from build_sticker_catalog import is_source_webp
+from catalog_watch import event_paths
+
+def event(kind, src, dest="", is_directory=False):
+    return SimpleNamespace(event_type=kind, src_path=str(src), dest_path=str(dest) if dest else "",
+                           is_directory=is_directory)
+
+def test_file_events_keep_sticker_paths_only(tmp_path):
+    assert event_paths(event("modified", tmp_path / "a/a.webp"), is_source_webp) == {str(tmp_path / "a/a.webp")}
+    assert event_paths(event("created", tmp_path / "a/a-thumb.webp"), is_source_webp) == set()
+    assert event_paths(event("moved", tmp_path / "a.webp", tmp_path / "b/b.webp"),
+                       is_source_webp) == {str(tmp_path / "a.webp"), str(tmp_path / "b/b.webp")}
+
+def test_directory_events_map_to_their_stickers(tmp_path):
+    (tmp_path / "new").mkdir()
+    (tmp_path / "new/old.webp").write_bytes(b"")
+    (tmp_path / "new/old-thumb.png").write_bytes(b"")
+
+    gone = event("deleted", tmp_path / "s_001", is_directory=True)
+    assert event_paths(gone, is_source_webp) == {str(tmp_path / "s_001/s_001.webp")}
+    moved = event("moved", tmp_path / "old", tmp_path / "new", is_directory=True)
+    assert event_paths(moved, is_source_webp) == {str(tmp_path / "old/old.webp"),
+                                                  str(tmp_path / "new/old.webp")}
+    assert event_paths(event("created", tmp_path / "new", is_directory=True), is_source_webp) == set()